@@ -3,16 +3,20 @@
 # Pray for Palestine 
 #####################################
 
-import nuke
-import random
-from PySide2.QtCore import QTimer, QObject, Qt
-from PySide2.QtWidgets import QApplication, QMessageBox
-from PySide2.QtGui import QKeyEvent
+from bisect import bisect_left, bisect_right
+from PySide2.QtCore import QObject
+
+from basegame import BaseGame
+from entities import Entity
+from gameloop import FPS
+from hud import Hud, background_label
+from inputs import KEY_LEFT, KEY_RIGHT, KEY_SPACE
+from nodepool import PARK_X, PARK_Y
 
 # Physics and game constants
 GRAVITY = 1.0          # Gravitational acceleration
 JUMP_VELOCITY = -20    # Jump impulse (negative because y increases downward)
-MOVE_STEP = 20         # Horizontal movement increment
+MOVE_STEP = 20         # Horizontal movement per update while an arrow key is held
 
 # Dimensions for game objects
 PLAYER_WIDTH = 50
@@ -28,6 +32,8 @@ BACKDROP_HEIGHT = 800
 
 # Vertical spacing between platforms
 PLATFORM_SPACING = 150
+# Platforms that can be in play at once: the backdrop plus one spacing above it.
+PLATFORM_SLOTS = BACKDROP_HEIGHT // PLATFORM_SPACING + 2
 
 # Falling speed parameters
 BASE_FALL_SPEED = 5       # Base falling speed for platforms (pixels per update)
@@ -36,9 +42,92 @@ FALL_SPEED_INCREMENT = 1  # How much the fall speed increases with each jump
 # Ground parameters
 GROUND_DOT_SPACING = 10  # Horizontal spacing between ground dots
 
-class IcyTowerGame(QObject):
-    def __init__(self):
+class PlatformHeights(object):
+    """The y of each platform in play, highest platform first, read straight from a ``PlatformRing``.
+
+    It is indexable like a list, so ``bisect`` can search the ring without copying it.
+    """
+
+    __slots__ = ('ring',)
+
+    def __init__(self, ring):
+        self.ring = ring
+
+    def __len__(self):
+        return self.ring.count
+
+    def __getitem__(self, i):
+        return self.ring.from_top(i).y
+
+
+class PlatformRing(object):
+    """A fixed set of platform entities used as a ring buffer, ordered from lowest to highest.
+
+    Platforms leave at the bottom and are reused at the top, so the lowest and the
+    highest one are O(1) to reach and no node is created or deleted during play.
+    Unused platforms are parked out of sight. The ring is always sorted by height,
+    so ``between`` finds a band of platforms by bisecting it in O(log n).
+    """
+
+    def __init__(self, renderer, capacity):
+        self.slots = [Entity(renderer, "NoOp", PARK_X, PARK_Y, name="Platform",
+                             width=PLATFORM_WIDTH, height=PLATFORM_HEIGHT, hide_input=True)
+                      for _ in range(capacity)]
+        self.first = 0  # slot of the lowest platform
+        self.count = 0
+        self.heights = PlatformHeights(self)
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        """Platforms in play, lowest first."""
+        slots = self.slots
+        for i in range(self.count):
+            yield slots[(self.first + i) % len(slots)]
+
+    def lowest(self):
+        return self.slots[self.first] if self.count else None
+
+    def highest(self):
+        return self.slots[(self.first + self.count - 1) % len(self.slots)] if self.count else None
+
+    def from_top(self, i):
+        """The i-th highest platform in play; 0 is the highest."""
+        return self.slots[(self.first + self.count - 1 - i) % len(self.slots)]
+
+    def between(self, top, bottom):
+        """Platforms in play with top <= y <= bottom, highest first, found by bisection."""
+        start = bisect_left(self.heights, top)
+        end = bisect_right(self.heights, bottom, start)
+        return [self.from_top(i) for i in range(start, end)]
+
+    def push_top(self, x, y):
+        """Puts a free platform at (x, y), above all others. Returns None when all are in play."""
+        if self.count == len(self.slots):
+            return None
+        platform = self.slots[(self.first + self.count) % len(self.slots)]
+        platform.x = x
+        platform.y = y
+        self.count += 1
+        return platform
+
+    def pop_bottom(self):
+        """Takes the lowest platform out of play and parks it."""
+        platform = self.slots[self.first]
+        platform.x = PARK_X
+        platform.y = PARK_Y
+        self.first = (self.first + 1) % len(self.slots)
+        self.count -= 1
+        return platform
+
+
+class IcyTowerGame(BaseGame, QObject):
+    KIND = "tower"
+
+    def __init__(self, renderer=None, fps=FPS, rng=None, profiler=None):
         super(IcyTowerGame, self).__init__()
+        self.open_session(renderer, rng, profiler)
         self.score = 0
         self.player_on_platform = False
         # Count the number of platform landings during safe mode
@@ -51,30 +140,30 @@ class IcyTowerGame(QObject):
         self.fall_speed_increment = FALL_SPEED_INCREMENT
         self.setup_game()
         self.generate_initial_platforms()
-        self.game_timer = QTimer()
-        self.game_timer.timeout.connect(self.update_game)
-        self.game_timer.start(50)
+        self.profiler.attach(self.renderer, (BACKDROP_X + BACKDROP_WIDTH + 20, BACKDROP_Y), "tower")
+        # Physics runs in fixed 50 ms steps however late the timer fires; frames are drawn at up to fps.
+        self.start_session((KEY_LEFT, KEY_RIGHT, KEY_SPACE), self.update_game, self.render, fps)
 
     def setup_game(self):
         """Sets up the game scene: the backdrop, the player, initial platforms, and the ground dots."""
-        self.backdrop = nuke.nodes.BackdropNode(
-            bdwidth=BACKDROP_WIDTH,
-            bdheight=BACKDROP_HEIGHT,
-            xpos=BACKDROP_X,
-            ypos=BACKDROP_Y,
-            label=f'<h1>Score: <font color="green"><b>{self.score}</b></font></h1>\n<img src="verticalBG.jpg" width="400">'
+        self.backdrop = self.renderer.create(
+            "BackdropNode", BACKDROP_X, BACKDROP_Y,
+            width=BACKDROP_WIDTH,
+            height=BACKDROP_HEIGHT,
+            label=background_label("verticalBG.jpg", 400)
         )
-        self.player = nuke.nodes.Axis(name="Player", hide_input=True, tile_color=536805631)
-        self.player['xpos'].setValue(BACKDROP_X + (BACKDROP_WIDTH - PLAYER_WIDTH) / 2)
-        self.player['ypos'].setValue(self.safe_line)
-        self.platforms = []
+        # The score lives in its own small node so the backdrop image is never laid out again.
+        self.hud = Hud(self.renderer, BACKDROP_X + 10, BACKDROP_Y + 10, self.score_text(), name="Score")
+        # Game objects keep their own state; nodes are only written to.
+        self.player = Entity(self.renderer, "Axis", BACKDROP_X + (BACKDROP_WIDTH - PLAYER_WIDTH) / 2, self.safe_line,
+                             name="Player", color=536805631,
+                             width=PLAYER_WIDTH, height=PLAYER_HEIGHT, hide_input=True)
+        self.platforms = PlatformRing(self.renderer, PLATFORM_SLOTS)
         # Create ground dots under the player to mimic the ground
         self.ground = []
         ground_y = self.safe_line + PLAYER_HEIGHT  # Position ground just below the player
         for x in range(BACKDROP_X, BACKDROP_X + BACKDROP_WIDTH, GROUND_DOT_SPACING):
-            dot = nuke.nodes.Dot(name="Ground", hide_input=True)
-            dot['xpos'].setValue(x)
-            dot['ypos'].setValue(ground_y)
+            dot = self.renderer.create("Dot", x, ground_y, name="Ground", hide_input=True)
             self.ground.append(dot)
 
     def generate_initial_platforms(self):
@@ -86,15 +175,44 @@ class IcyTowerGame(QObject):
             y -= PLATFORM_SPACING
 
     def create_platform(self, y):
-        """Creates a platform (a NoOp node) at a given y coordinate with a random x position."""
+        """Puts a platform on top of the others at a given y coordinate with a random x position.
+
+        Returns None if every platform is already in play.
+        """
         x_min = BACKDROP_X
         x_max = BACKDROP_X + BACKDROP_WIDTH - PLATFORM_WIDTH
-        x = random.randint(int(x_min), int(x_max))
-        platform = nuke.nodes.NoOp(name="Platform", hide_input=True)
-        platform['xpos'].setValue(x)
-        platform['ypos'].setValue(y)
-        self.platforms.append(platform)
-        return platform
+        x = self.rng.randint(int(x_min), int(x_max))
+        return self.platforms.push_top(x, y)
+
+    def fill_to_top(self):
+        """Adds platforms above the highest one until the top of the backdrop is covered."""
+        highest = self.platforms.highest()
+        highest_platform_y = highest.y if highest is not None else BACKDROP_Y
+        while highest_platform_y > BACKDROP_Y:
+            new_platform = self.create_platform(highest_platform_y - PLATFORM_SPACING)
+            if new_platform is None:
+                break
+            highest_platform_y = new_platform.y
+
+    def poll_input(self):
+        """Moves the player by the arrow keys held, and jumps on every press of Space."""
+        direction = self.inputs.axis(KEY_LEFT, KEY_RIGHT)
+        if direction:
+            self.move_player(direction * MOVE_STEP)
+        if KEY_SPACE in self.inputs.take_pressed():
+            self.player_jump()
+
+    def move_player(self, delta):
+        """Move the player horizontally while keeping within backdrop bounds."""
+        new_x = self.player.x + delta
+        left_bound = BACKDROP_X
+        right_bound = BACKDROP_X + BACKDROP_WIDTH - PLAYER_WIDTH
+        if new_x < left_bound:
+            new_x = left_bound
+        elif new_x > right_bound:
+            new_x = right_bound
+        # The player node catches up in the next frame.
+        self.player.x = new_x
 
     def update_game(self):
         """Main game loop: update physics, check for collisions, manage falling, ground deletion, and generate new platforms."""
@@ -102,141 +220,112 @@ class IcyTowerGame(QObject):
         self.player_velocity_y = getattr(self, 'player_velocity_y', 0) + GRAVITY
 
         # Update the player's vertical position
-        current_y = self.player['ypos'].value()
+        player_x, current_y = self.player.x, self.player.y
         new_y = current_y + self.player_velocity_y
-        self.player['ypos'].setValue(new_y)
+        self.player.y = new_y
 
-        # Check for landing on a platform
+        # Check for landing on a platform. Platforms fall by platform_dy later in this step, so
+        # the feet are swept relative to them: every platform whose top lies between where the
+        # feet were and where they end up relative to the platforms was crossed this step, and
+        # the highest one under the player's center is the one landed on, at any speed.
         if self.player_velocity_y > 0:
-            for platform in self.platforms:
-                plat_x = platform['xpos'].value()
-                plat_y = platform['ypos'].value()
-                player_center_x = self.player['xpos'].value() + PLAYER_WIDTH / 2
+            platform_dy = self.current_fall_speed if self.platforms_jumped >= 3 else 0
+            feet_before = current_y + PLAYER_HEIGHT
+            feet_after = max(feet_before, new_y + PLAYER_HEIGHT - platform_dy)
+            player_center_x = player_x + PLAYER_WIDTH / 2
+            landed = False
+            for platform in self.platforms.between(feet_before, feet_after):
+                plat_x, plat_y = platform.x, platform.y
                 if (player_center_x >= plat_x and player_center_x <= plat_x + PLATFORM_WIDTH):
-                    if current_y + PLAYER_HEIGHT <= plat_y and new_y + PLAYER_HEIGHT >= plat_y:
-                        # Snap the player onto the platform and reset vertical velocity
-                        self.player['ypos'].setValue(plat_y - PLAYER_HEIGHT)
-                        self.player_velocity_y = 0
-                        if not self.player_on_platform:
-                            self.platforms_jumped += 1
-                        self.player_on_platform = True
-                        # Reset falling speed upon landing
-                        self.current_fall_speed = self.base_fall_speed
-                        self.score = max(self.score, int((BACKDROP_Y + BACKDROP_HEIGHT) - plat_y))
-                        self.backdrop['label'].setValue(f'<h1>Score: <font color="green"><b>{self.score}</b></font></h1>\n<img src="verticalBG.jpg" width="400">')
-                        break
-                    else:
-                        self.player_on_platform = False
+                    # Snap the player onto the platform and reset vertical velocity
+                    self.player.y = plat_y - PLAYER_HEIGHT
+                    self.player_velocity_y = 0
+                    if not self.player_on_platform:
+                        self.platforms_jumped += 1
+                    self.player_on_platform = True
+                    # Reset falling speed upon landing
+                    self.current_fall_speed = self.base_fall_speed
+                    self.score = max(self.score, int((BACKDROP_Y + BACKDROP_HEIGHT) - plat_y))
+                    self.hud.set(self.score_text())
+                    landed = True
+                    break
+            if not landed:
+                self.player_on_platform = False
 
         # Safe mode for first three landings: prevent falling below safe line
         if self.platforms_jumped < 3:
             if new_y > self.safe_line:
-                self.player['ypos'].setValue(self.safe_line)
+                self.player.y = self.safe_line
                 self.player_velocity_y = 0
         else:
             # Once safe mode is over, start falling:
             for platform in self.platforms:
-                platform['ypos'].setValue(platform['ypos'].value() + self.current_fall_speed)
+                self.shift_down(platform, self.current_fall_speed)
             if self.player_on_platform:
-                self.player['ypos'].setValue(self.player['ypos'].value() + self.current_fall_speed)
-            # Delete platforms that have fallen below the backdrop
-            remaining_platforms = []
-            for platform in self.platforms:
-                if platform['ypos'].value() > BACKDROP_Y + BACKDROP_HEIGHT:
-                    nuke.delete(platform)
-                else:
-                    remaining_platforms.append(platform)
-            self.platforms = remaining_platforms
+                self.shift_down(self.player, self.current_fall_speed)
+            # Platforms that have fallen below the backdrop leave the bottom of the ring, to be
+            # reused at the top
+            while self.platforms and self.platforms.lowest().y > BACKDROP_Y + BACKDROP_HEIGHT:
+                self.platforms.pop_bottom()
 
             # Delete the ground dots once falling begins
             if self.ground:
                 for dot in self.ground:
-                    nuke.delete(dot)
+                    self.renderer.delete(dot)
                 self.ground = []
 
             # Generate new platforms at the top if needed
-            highest_platform_y = min([p['ypos'].value() for p in self.platforms]) if self.platforms else BACKDROP_Y
-            while highest_platform_y > BACKDROP_Y:
-                new_platform = self.create_platform(highest_platform_y - PLATFORM_SPACING)
-                highest_platform_y = new_platform['ypos'].value()
+            self.fill_to_top()
 
             # Check for game over: if the player falls below the backdrop
-            if self.player['ypos'].value() > BACKDROP_Y + BACKDROP_HEIGHT:
+            if self.player.y > BACKDROP_Y + BACKDROP_HEIGHT:
                 self.end_game("Game Over! You fell off the tower.")
 
         # If the player climbs above a threshold, shift the scene downward (simulate upward movement)
         threshold = BACKDROP_Y + BACKDROP_HEIGHT / 3
         if new_y < threshold:
             delta = threshold - new_y
-            self.player['ypos'].setValue(threshold)
+            self.player.y = threshold
             for platform in self.platforms:
-                platform['ypos'].setValue(platform['ypos'].value() + delta)
+                self.shift_down(platform, delta)
             self.score += int(delta)
-            self.backdrop['label'].setValue(f'<h1>Score: <font color="green"><b>{self.score}</b></font></h1>\n<img src="verticalBG.jpg" width="400">')
-            highest_platform_y = min([p['ypos'].value() for p in self.platforms]) if self.platforms else BACKDROP_Y
-            while highest_platform_y > BACKDROP_Y:
-                new_platform = self.create_platform(highest_platform_y - PLATFORM_SPACING)
-                highest_platform_y = new_platform['ypos'].value()
+            self.hud.set(self.score_text())
+            self.fill_to_top()
+
+    def score_text(self):
+        return f'Score: <font color="green"><b>{self.score}</b></font>'
+
+    def render(self, alpha=1.0):
+        """Syncs the nodes with the game state after one or more game steps."""
+        with self.profiler.phase('sprites'):
+            self.hud.render()
+            self.player.sync(self.renderer)
+            # Every slot, so platforms that left play get parked too.
+            for platform in self.platforms.slots:
+                platform.sync(self.renderer)
+        with self.profiler.phase('commit'):
+            self.renderer.end_frame()
+
+    def shift_down(self, entity, delta):
+        """Moves a game object down by delta."""
+        entity.y += delta
 
     def player_jump(self):
         """Make the player jump if on a platform or the ground.
            When safe mode is off, increment the falling speed to add challenge."""
-        if self.player_on_platform or self.player['ypos'].value() >= self.safe_line:
+        if self.player_on_platform or self.player.y >= self.safe_line:
             # Increase falling speed with each jump once safe mode is off.
             if self.platforms_jumped >= 3:
                 self.current_fall_speed += self.fall_speed_increment
             self.player_velocity_y = JUMP_VELOCITY
             self.player_on_platform = False
 
-    def end_game(self, message):
-        """Stop the game and display a game over message."""
-        self.game_timer.stop()
-        QMessageBox.critical(None, "Game Over", message)
-
-
-class PlayerKeyListener(QObject):
-    def __init__(self, game):
-        super(PlayerKeyListener, self).__init__()
-        self.game = game
-        self.app = QApplication.instance()
-        if not self.app:
-            self.app = QApplication([])
-        self.app.installEventFilter(self)
-        self.move_step = MOVE_STEP
-
-    def eventFilter(self, obj, event):
-        if isinstance(event, QKeyEvent) and event.type() == QKeyEvent.KeyPress:
-            key = event.key()
-            if key == Qt.Key_Left:
-                self.move_player(-self.move_step)
-                return True
-            elif key == Qt.Key_Right:
-                self.move_player(self.move_step)
-                return True
-            elif key == Qt.Key_Space:
-                self.game.player_jump()
-                return True
-        return False
-
-    def move_player(self, delta):
-        """Move the player horizontally while keeping within backdrop bounds."""
-        current_x = self.game.player['xpos'].value()
-        new_x = current_x + delta
-        left_bound = BACKDROP_X
-        right_bound = BACKDROP_X + BACKDROP_WIDTH - PLAYER_WIDTH
-        if new_x < left_bound:
-            new_x = left_bound
-        elif new_x > right_bound:
-            new_x = right_bound
-        self.game.player['xpos'].setValue(new_x)
-
 
-def start_icy_tower_game():
-    global game, key_listener
-    game = IcyTowerGame()
-    key_listener = PlayerKeyListener(game)
+def start_icy_tower_game(renderer=None, fps=FPS, rng=None, profiler=None):
+    global game
+    game = IcyTowerGame(renderer, fps, rng, profiler)
     # Optionally, adjust the Nuke viewer or zoom as needed
-    nuke.zoom(1, [BACKDROP_X + BACKDROP_WIDTH/2, BACKDROP_Y + BACKDROP_HEIGHT/2])
+    game.renderer.zoom(1, [BACKDROP_X + BACKDROP_WIDTH/2, BACKDROP_Y + BACKDROP_HEIGHT/2])
 
 # Uncomment the following line to run the game:
 # start_icy_tower_game()
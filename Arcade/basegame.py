@@ -0,0 +1,82 @@
+"""Setting up and ending a game, shared by all of them.
+
+``BaseGame`` is mixed into every game class. A game's constructor calls
+
+* ``open_session`` first: it closes an earlier game of the same ``KIND`` and
+  sets up ``renderer``, ``rng`` and ``profiler``, so nothing is drawn before
+  the old game is gone;
+* ``start_session`` last: it takes the game's keys, starts its ``GameLoop``
+  (polling the keys and calling ``poll_input`` before every step) and
+  registers the game with ``sessions`` only now that it is fully built.
+
+``end_game`` is the usual game over: stop, show the final frame and the
+message, then delete every node of the game.
+"""
+
+import random
+
+from PySide2.QtWidgets import QMessageBox
+
+import sessions
+from gameloop import GameLoop
+from inputs import InputManager
+from profiler import NullProfiler
+from renderers import NodeRenderer
+
+
+class BaseGame(object):
+    KIND = None  # game type; one game of each type runs at a time
+    hud = None   # a hud.Hud, for games that show a score
+
+    def open_session(self, renderer=None, rng=None, profiler=None):
+        """Closes the earlier game of this type and sets up what the game draws and rolls with.
+
+        renderer: what everything is drawn through; a ``NodeRenderer`` (real Nuke nodes) when None.
+        rng:      source of randomness; pass a seeded ``random.Random`` for repeatable games.
+        profiler: a ``profiler.Profiler`` to time frames with; nothing is timed when None.
+        """
+        sessions.begin(self.KIND, self)
+        self.renderer = renderer if renderer is not None else NodeRenderer()
+        self.rng = rng if rng is not None else random
+        self.profiler = profiler if profiler is not None else NullProfiler()
+
+    def start_session(self, keys, update, render, fps, **loop_options):
+        """Takes ``keys``, starts the game loop and marks the game as running.
+
+        Extra keyword arguments go to ``GameLoop``. Events can be put on
+        ``scheduler`` once this returns.
+        """
+        self.inputs = InputManager.get().acquire(self, keys)
+        self.loop = GameLoop(update, render, fps=fps, profiler=self.profiler, poll=self.poll_keys,
+                             **loop_options)
+        self.scheduler = self.loop.scheduler
+        self.loop.start()
+        sessions.started(self.KIND, self)
+
+    def poll_keys(self):
+        self.inputs.poll()
+        self.poll_input()
+
+    def poll_input(self):
+        """Applies the keys held; called before every step."""
+
+    def stop_play(self):
+        """Stops the loop and its events, and gives the keys back to Nuke for the message box."""
+        self.loop.stop()
+        self.inputs.release(self)
+
+    def end_game(self, message):
+        """Stops the game, shows ``message`` over its final state, then closes it."""
+        self.stop_play()
+        if self.hud is not None:
+            self.hud.render(force=True)
+        self.render()
+        self.show_message(message)
+        self.close()
+
+    def show_message(self, message):
+        QMessageBox.critical(None, "Game Over", message)
+
+    def close(self):
+        """Deletes every node of the game."""
+        sessions.close(self)
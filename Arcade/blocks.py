@@ -4,10 +4,14 @@
 #####################################
 
 import nuke
-import random
-from PySide2.QtCore import QTimer, Qt, QObject
-from PySide2.QtWidgets import QApplication
-from PySide2.QtGui import QKeyEvent
+from PySide2.QtCore import QObject
+
+from basegame import BaseGame
+from entities import Entity
+from gameloop import FPS
+from hud import background_label
+from inputs import KEY_LEFT, KEY_RIGHT
+from spatial import SpatialHash, sweep_box
 
 # Define dimensions for collision detection
 PLAYER_WIDTH = 100
@@ -15,72 +19,121 @@ PLAYER_HEIGHT = 20
 BLOCK_WIDTH = 80
 BLOCK_HEIGHT = 40
 
-class NukeGame(QObject):
-    def __init__(self):
+# Backdrop dimensions and position (the game area)
+BACKDROP_X = 50
+BACKDROP_Y = 50
+BACKDROP_WIDTH = 800
+BACKDROP_HEIGHT = 380
+
+# Cell size of the brick index; a brick overlaps at most four cells.
+BRICK_CELL_SIZE = 100
+# Most bricks the ball can bounce off within one step.
+MAX_BOUNCES = 4
+# Pixels the plate moves per step while an arrow key is held.
+PLATE_SPEED = 20
+
+class NukeGame(BaseGame, QObject):
+    KIND = "blocks"
+
+    def __init__(self, renderer=None, fps=FPS, rng=None, profiler=None):
         super(NukeGame, self).__init__()
+        self.open_session(renderer, rng, profiler)
         self.setup_game()
+        self.profiler.attach(self.renderer, (BACKDROP_X + BACKDROP_WIDTH + 20, BACKDROP_Y), "blocks")
         # Set initial ball movement (dx, dy)
         self.ball_dx = 5    # horizontal speed
         self.ball_dy = -5   # vertical speed (-ve means upward)
-        # Timer to update ball position periodically (every 50 ms)
-        self.timer = QTimer()
-        self.timer.timeout.connect(self.update_ball)
-        self.timer.start(50)
+        # The ball moves in fixed 50 ms steps; frames are drawn at up to fps, in between steps
+        # the ball is shown interpolated between its last two positions.
+        self.start_session((KEY_LEFT, KEY_RIGHT), self.update_ball, self.render, fps)
 
     def setup_game(self):
         # Create a backdrop node to define the game area.
         # The backdrop's top-left corner is at (50, 50) and its size is 800 x 380.
-        self.backdrop = nuke.nodes.BackdropNode(
-            bdwidth=800,
-            bdheight=380,
-            xpos=50,
-            ypos=50,
-            label=r'<img src="horizontalBG.jpg" width="795">'
+        self.backdrop = self.renderer.create(
+            "BackdropNode", BACKDROP_X, BACKDROP_Y,
+            width=BACKDROP_WIDTH,
+            height=BACKDROP_HEIGHT,
+            label=background_label("horizontalBG.jpg", 795)
         )
 
-        nuke.zoom(1, [400, 300])
+        self.renderer.zoom(1, [400, 300])
         
-        # Create the player plate (a NoOp node) positioned near the bottom.
-        self.player_plate = nuke.nodes.NoOp(name="player plate", hide_input=True)
-        self.player_plate['xpos'].setValue(200)
-        self.player_plate['ypos'].setValue(350)  # Placed inside the 400 height area
+        # Create the player plate (a NoOp node) positioned near the bottom,
+        # inside the 400 height area. Game objects keep their own state; nodes are only written to.
+        self.player_plate = Entity(self.renderer, "NoOp", 200, 350, name="player plate",
+                                   width=PLAYER_WIDTH, height=PLAYER_HEIGHT, hide_input=True)
 
-        # Create blocks: 3 rows x 8 columns
+        # Create blocks: 3 rows x 8 columns. The ball only tests the bricks in the grid cells
+        # its path crosses.
         self.blocks = []
+        self.brick_index = SpatialHash(BRICK_CELL_SIZE)
         block_start_x = 100
         block_start_y = 100
         for row in range(3):
             for col in range(8):
-                block = nuke.nodes.NoOp(name=f"block_{row}_{col}", hide_input = True)
                 xpos = block_start_x + col * (BLOCK_WIDTH + 10)
                 ypos = block_start_y + row * (BLOCK_HEIGHT + 10)
-                block['xpos'].setValue(xpos)
-                block['ypos'].setValue(ypos)
                 # Set a random tile color (using a random integer value)
-                random_color = random.randint(0, 0xFFFFFF)
-                block['tile_color'].setValue(random_color)
+                random_color = self.rng.randint(0, 0xFFFFFF)
+                block = Entity(self.renderer, "NoOp", xpos, ypos, name=f"block_{row}_{col}", color=random_color,
+                               width=BLOCK_WIDTH, height=BLOCK_HEIGHT, hide_input=True)
                 self.blocks.append(block)
+                self.brick_index.insert(block, xpos, ypos, BLOCK_WIDTH, BLOCK_HEIGHT)
+
+        # Create the ball as a Dot node, starting just above the player plate
+        self.ball = Entity(self.renderer, "Dot", 250, 330, name="ball", hide_input=True)
+        self.previous_ball = (self.ball.x, self.ball.y)
+
+    def first_hit(self, x, y, dx, dy):
+        """The first brick, or the plate, the ball meets moving by (dx, dy), as (t, axis, entity), or None."""
+        first = None
+        for block in self.brick_index.query_rect(x, y, x + dx, y + dy) + [self.player_plate]:
+            hit = sweep_box(x, y, dx, dy, block.x, block.y, block.x + block.width, block.y + block.height)
+            if hit is not None and (first is None or hit[0] < first[0]):
+                first = hit + (block,)
+        return first
 
-        # Create the ball as a Dot node
-        self.ball = nuke.nodes.Dot(name="ball", hide_input=True)
-        self.ball['xpos'].setValue(250)
-        self.ball['ypos'].setValue(330)  # Starting just above the player plate
+    def poll_input(self):
+        # The plate node catches up in the next frame.
+        self.player_plate.x += self.inputs.axis(KEY_LEFT, KEY_RIGHT) * PLATE_SPEED
 
     def update_ball(self):
-        current_x = self.ball['xpos'].value()
-        current_y = self.ball['ypos'].value()
-        new_x = current_x + self.ball_dx
-        new_y = current_y + self.ball_dy
+        current_x, current_y = self.ball.x, self.ball.y
+
+        # --- Collision with blocks and the player plate ---
+        # Sweep the ball along its whole step so a fast ball can't pass through a brick: stop at
+        # the first brick on the way, bounce off the side it hit, and carry on with the rest.
+        new_x, new_y = current_x, current_y
+        remaining = 1.0
+        for _ in range(MAX_BOUNCES):
+            move_x = self.ball_dx * remaining
+            move_y = self.ball_dy * remaining
+            hit = self.first_hit(new_x, new_y, move_x, move_y)
+            if hit is None:
+                new_x += move_x
+                new_y += move_y
+                break
+            t, axis, block = hit
+            new_x += move_x * t
+            new_y += move_y * t
+            remaining *= 1.0 - t
+            if axis == 0:
+                self.ball_dx = -self.ball_dx
+            else:
+                self.ball_dy = -self.ball_dy
+            if block is self.player_plate:
+                continue
+            # Remove the hit block from the scene
+            self.blocks.remove(block)
+            self.brick_index.remove(block)
+            block.delete(self.renderer)
 
         # Get backdrop boundaries
-        bd_x = self.backdrop['xpos'].value()
-        bd_y = self.backdrop['ypos'].value()
-        bd_width = self.backdrop['bdwidth'].value()
-        bd_height = self.backdrop['bdheight'].value()
-        left_edge = bd_x
-        right_edge = bd_x + bd_width
-        top_edge = bd_y
-        bottom_edge = bd_y + bd_height
+        left_edge = BACKDROP_X
+        right_edge = BACKDROP_X + BACKDROP_WIDTH
+        top_edge = BACKDROP_Y
+        bottom_edge = BACKDROP_Y + BACKDROP_HEIGHT
 
         # --- Check backdrop boundaries ---
         # Left edge
@@ -100,79 +153,38 @@ class NukeGame(QObject):
 
         # Bottom edge: game over
         if new_y >= bottom_edge:
-            nuke.message("Game Over")
-            self.timer.stop()
+            self.end_game("Game Over")
             return  # Exit without updating the ball position
 
         # --- Collision with player plate ---
-        plate_x = self.player_plate['xpos'].value()
-        plate_y = self.player_plate['ypos'].value()
-        if (new_x >= plate_x and new_x <= plate_x + PLAYER_WIDTH and
-            new_y >= plate_y and new_y <= plate_y + PLAYER_HEIGHT):
+        if self.player_plate.contains(new_x, new_y):
             # Bounce the ball upward
             self.ball_dy = -abs(self.ball_dy)
-            new_y = plate_y - 1  # Adjust the ball to just above the plate
-
-        # --- Collision with blocks ---
-        blocks_to_remove = []
-        for block in self.blocks:
-            block_x = block['xpos'].value()
-            block_y = block['ypos'].value()
-            if (new_x >= block_x and new_x <= block_x + BLOCK_WIDTH and
-                new_y >= block_y and new_y <= block_y + BLOCK_HEIGHT):
-                # Bounce the ball downward
-                self.ball_dy = abs(self.ball_dy)
-                blocks_to_remove.append(block)
-
-        # Remove any hit blocks from the scene
-        for block in blocks_to_remove:
-            self.blocks.remove(block)
-            nuke.delete(block)
-            # print("Block hit and removed:", block.name())
+            new_y = self.player_plate.y - 1  # Adjust the ball to just above the plate
 
         # Check if all blocks have been removed: win condition!
         if not self.blocks:
-            nuke.message("Congratulations")
-            self.timer.stop()
+            self.end_game("Congratulations")
             return
 
-        # Update ball position
-        self.ball['xpos'].setValue(new_x)
-        self.ball['ypos'].setValue(new_y)
-
-
-class PlayerKeyListener(QObject):
-    def __init__(self, game):
-        super(PlayerKeyListener, self).__init__()
-        self.game = game
-        self.app = QApplication.instance()
-        if not self.app:
-            self.app = QApplication([])
-        # Install event filter to capture key presses
-        self.app.installEventFilter(self)
-        self.move_step = 20  # How many pixels to move the player plate per key press
-
-    def eventFilter(self, obj, event):
-        if isinstance(event, QKeyEvent):
-            if event.type() == QKeyEvent.KeyPress:
-                # Move left with Left arrow key
-                if event.key() == Qt.Key_Left:
-                    self.move_player(-self.move_step)
-                    return True
-                # Move right with Right arrow key
-                elif event.key() == Qt.Key_Right:
-                    self.move_player(self.move_step)
-                    return True
-        return False
-
-    def move_player(self, delta):
-        current_x = self.game.player_plate['xpos'].value()
-        new_x = current_x + delta
-        self.game.player_plate['xpos'].setValue(new_x)
-        # print("Player moved to", new_x)
-
-def start_nuke_game():
-    global game, key_listener
-    # Initialize the game and the key listener
-    game = NukeGame()
-    key_listener = PlayerKeyListener(game)
+        # Update ball position; the node follows in render()
+        self.previous_ball = (current_x, current_y)
+        self.ball.x, self.ball.y = new_x, new_y
+
+    def render(self, alpha=1.0):
+        previous_x, previous_y = self.previous_ball
+        with self.profiler.phase('sprites'):
+            self.ball.show(self.renderer, previous_x + (self.ball.x - previous_x) * alpha,
+                           previous_y + (self.ball.y - previous_y) * alpha)
+            self.player_plate.sync(self.renderer)
+        with self.profiler.phase('commit'):
+            self.renderer.end_frame()
+
+    def show_message(self, message):
+        nuke.message(message)
+
+
+def start_nuke_game(renderer=None, fps=FPS, rng=None, profiler=None):
+    global game
+    # Initialize the game; it takes the keyboard until it ends
+    game = NukeGame(renderer, fps, rng, profiler)
@@ -0,0 +1,81 @@
+"""Python-side state of the objects the arcade games draw.
+
+An ``Entity`` owns the position, size and color of one game object; the node
+(or other renderer sprite) behind ``handle`` is only ever written to, never
+read back. Game logic works on entities alone, and ``sync`` pushes a changed
+position to the renderer once per frame.
+
+``SpritePool`` recycles a fixed set of entities for objects that come and go
+all the time, so spawning one costs a move instead of a node creation.
+"""
+
+from nodepool import PARK_X, PARK_Y
+
+
+class Entity(object):
+    __slots__ = ('handle', 'x', 'y', 'width', 'height', 'color', 'shown')
+
+    def __init__(self, renderer, node_class, x, y, width=0, height=0, color=None, **knobs):
+        """Creates the sprite through ``renderer``; extra keywords are passed on to ``create``."""
+        self.x = x
+        self.y = y
+        self.width = width
+        self.height = height
+        self.color = color
+        self.handle = renderer.create(node_class, int(x), int(y), color=color,
+                                      width=width or None, height=height or None, **knobs)
+        self.shown = (int(x), int(y))
+
+    def contains(self, x, y):
+        """True if the point lies inside the entity's box, edges included."""
+        return self.x <= x <= self.x + self.width and self.y <= y <= self.y + self.height
+
+    def show(self, renderer, x, y):
+        """Moves the sprite to (x, y) unless it is already there."""
+        position = (int(x), int(y))
+        if position != self.shown:
+            renderer.move(self.handle, position[0], position[1])
+            self.shown = position
+
+    def sync(self, renderer):
+        """Moves the sprite to the entity's position."""
+        self.show(renderer, self.x, self.y)
+
+    def delete(self, renderer):
+        renderer.delete(self.handle)
+
+
+class SpritePool(object):
+    """A fixed number of entities of one node class, parked out of sight while unused.
+
+    ``acquire`` and ``release`` are O(1): free entities sit on a stack.
+    """
+
+    def __init__(self, renderer, node_class, capacity, **knobs):
+        self.renderer = renderer
+        self.free = [Entity(renderer, node_class, PARK_X, PARK_Y, **knobs) for _ in range(capacity)]
+        self.capacity = capacity
+
+    def __len__(self):
+        """Number of entities in use."""
+        return self.capacity - len(self.free)
+
+    def acquire(self, x, y, color=None):
+        """Takes a free entity and puts it at (x, y); returns None when all are in use."""
+        if not self.free:
+            return None
+        entity = self.free.pop()
+        entity.x = x
+        entity.y = y
+        if color is not None and color != entity.color:
+            entity.color = color
+            self.renderer.set_color(entity.handle, color)
+        entity.sync(self.renderer)
+        return entity
+
+    def release(self, entity):
+        """Parks an entity taken from this pool and makes it available again."""
+        entity.x = PARK_X
+        entity.y = PARK_Y
+        entity.sync(self.renderer)
+        self.free.append(entity)
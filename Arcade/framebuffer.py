@@ -0,0 +1,49 @@
+"""Off-screen framebuffer for the grid based games.
+
+Render passes draw packed ARGB ints into a flat, row-major ``pixels`` list.
+``swap`` then reports only the cells whose color changed since the previous
+swap, so a renderer showing a frame that looks like the last one makes
+(almost) no knob writes.
+"""
+
+
+class FrameBuffer(object):
+    def __init__(self, width, height, color=0):
+        self.width = width
+        self.height = height
+        self.pixels = [color] * (width * height)
+        # Colors last pushed to the display; None makes the first swap report every cell.
+        self.front = [None] * (width * height)
+
+    def clear(self, color):
+        """Fills the whole buffer with a single color."""
+        self.pixels[:] = [color] * len(self.pixels)
+
+    def load(self, pixels):
+        """Replaces the whole buffer with a flat, row-major list of colors."""
+        self.pixels[:] = pixels
+
+    def set_pixel(self, col, row, color):
+        """Sets one cell, silently ignoring coordinates outside the buffer."""
+        if 0 <= col < self.width and 0 <= row < self.height:
+            self.pixels[row * self.width + col] = color
+
+    def fill_column(self, col, start, end, color):
+        """Fills rows [start, end) of a column with a single color."""
+        start = max(0, start)
+        end = min(self.height, end)
+        if start < end:
+            self.pixels[start * self.width + col:end * self.width + col:self.width] = [color] * (end - start)
+
+    def dirty_cells(self):
+        """Returns the flat indices of the cells that changed since the last swap."""
+        return [i for i, (new, old) in enumerate(zip(self.pixels, self.front)) if new != old]
+
+    def swap(self):
+        """Marks the current pixels as displayed and returns the indices that changed."""
+        pixels = self.pixels
+        front = self.front
+        dirty = self.dirty_cells()
+        for i in dirty:
+            front[i] = pixels[i]
+        return dirty
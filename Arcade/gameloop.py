@@ -0,0 +1,153 @@
+"""Fixed-timestep game loop shared by the games.
+
+All game physics is tuned per 50 ms step. ``GameLoop`` measures real elapsed
+time with a monotonic clock and runs as many fixed steps as that time covers,
+so the game plays at the same speed however late the Qt timer fires. Rendering
+is decoupled from the steps:
+
+* several steps that fall due in one timer tick share a single render;
+* when the loop is so far behind that it hits ``max_steps``, the surplus time
+  is dropped and renders are skipped for a few ticks so updates can catch up;
+* ``render`` gets ``alpha``, the fraction of a step that has passed since the
+  last update, so positions can be interpolated when ``fps`` is above the step
+  rate.
+
+Each loop has a ``scheduler.Scheduler`` that moves on one step after every
+update, so delayed game events run on game time. Stopping the loop cancels
+them all.
+
+A ``profiler.Profiler`` passed as ``profiler`` times ``poll`` as the ``input``
+phase and the updates as the ``simulation`` phase, closes a frame after every
+render and writes its CSV when the loop stops.
+"""
+
+import time
+
+from profiler import NullProfiler
+from scheduler import Scheduler
+
+try:
+    from PySide2.QtCore import QTimer, Qt
+except ImportError:
+    QTimer = Qt = None
+
+STEP = 0.05  # seconds of game time per update
+FPS = 20     # default timer / render rate
+
+# Clock of loops created without one; headless runs swap in a virtual clock.
+default_clock = time.perf_counter
+
+
+class GameLoop(object):
+    """Calls ``update`` every ``step`` seconds of real time and ``render`` at up to ``fps``."""
+
+    def __init__(self, update, render=None, fps=FPS, step=STEP, max_steps=5, max_frame_skip=2,
+                 clock=None, timer=None, callback=None, profiler=None, poll=None):
+        """
+        update:   called once per fixed step.
+        render:   called with alpha after the steps of a tick; optional.
+        clock:    monotonic clock in seconds; ``default_clock`` when omitted.
+        timer:    a QTimer-like object driving ``tick``; a QTimer when omitted.
+        callback: what the timer calls instead of ``tick``, for games that wrap it.
+        profiler: a ``profiler.Profiler``; nothing is timed when omitted.
+        poll:     called before every update to apply the keys held, timed as ``input``.
+        """
+        self.update = update
+        self.poll = poll
+        self.render = render
+        self.step = step
+        self.max_steps = max_steps
+        self.max_frame_skip = max_frame_skip
+        self.clock = clock if clock is not None else default_clock
+        self.profiler = profiler if profiler is not None else NullProfiler()
+        self.scheduler = Scheduler()
+        self.timer = timer if timer is not None else QTimer()
+        if Qt is not None and hasattr(self.timer, 'setTimerType'):
+            self.timer.setTimerType(Qt.PreciseTimer)
+        self.timer.timeout.connect(callback if callback is not None else self.tick)
+        self.running = False
+        self.starts = 0  # times start was called; a tick ends when update restarts the loop
+        self.accumulator = 0.0
+        self.last_time = None
+        self.frames_skipped = 0
+        self.ticks = 0          # updates run since start
+        self.frames = 0         # renders since start
+        self.dropped_steps = 0  # steps given up while hopelessly behind
+        self.frame_ms = 0.0     # wall time of the last tick, updates and render included
+        self.set_fps(fps)
+
+    def set_fps(self, fps):
+        """Sets how often the timer fires and the game renders. Game speed is unaffected."""
+        self.fps = fps
+        self.interval = int(round(1000.0 / fps))
+        if self.running:
+            self.timer.start(self.interval)
+
+    def start(self):
+        self.starts += 1
+        self.running = True
+        self.accumulator = 0.0
+        self.last_time = self.clock()
+        self.frames_skipped = 0
+        self.timer.start(self.interval)
+
+    def stop(self):
+        was_running = self.running
+        self.running = False
+        self.timer.stop()
+        self.scheduler.clear()
+        if was_running:
+            self.profiler.game_over()
+
+    def tick(self):
+        """Runs the steps that fell due since the last tick, then renders at most once.
+
+        Returns True if a render happened.
+        """
+        if not self.running:
+            return False
+        start = time.perf_counter()
+        starts = self.starts
+        now = self.clock()
+        self.accumulator += now - self.last_time
+        self.last_time = now
+
+        # A timer firing a hair early shouldn't cost a whole step; the deficit is carried over.
+        tolerance = self.step * 0.1
+        steps = 0
+        behind = False
+        while self.running and self.accumulator + tolerance >= self.step:
+            if steps == self.max_steps:
+                dropped = int(self.accumulator // self.step)
+                self.dropped_steps += dropped
+                self.accumulator -= dropped * self.step
+                behind = True
+                break
+            if self.poll is not None:
+                with self.profiler.phase('input'):
+                    self.poll()
+            with self.profiler.phase('simulation'):
+                self.update()
+                if self.starts != starts:
+                    # The update ended the game and started a new one, which begins afresh.
+                    return False
+                if self.running:
+                    self.scheduler.advance(self.step)
+            self.ticks += 1
+            steps += 1
+            self.accumulator -= self.step
+
+        rendered = False
+        if self.running and self.render is not None:
+            if behind and self.frames_skipped < self.max_frame_skip:
+                self.frames_skipped += 1
+            elif steps or self.fps > 1.0 / self.step:
+                # Without a new step there is only something new to show when interpolating.
+                self.frames_skipped = 0
+                self.render(min(1.0, max(0.0, self.accumulator / self.step)))
+                self.frames += 1
+                rendered = True
+        self.frame_ms = (time.perf_counter() - start) * 1000.0
+        if rendered:
+            self.profiler.end_frame(self.frame_ms)
+        return rendered
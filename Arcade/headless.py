@@ -0,0 +1,478 @@
+"""Headless runs of the games: no Nuke, no Qt event loop, no wall-clock time.
+
+``install`` puts lightweight stand-ins for ``nuke`` and the few PySide2
+classes the games use into ``sys.modules``; import the games after calling it.
+
+* The ``nuke`` stand-in keeps nodes in memory and counts every node creation,
+  deletion, knob read and knob write in ``ops`` (``undo`` counts the ones made
+  with undo recording on). With ``record=True`` each one is also appended to
+  ``log``. Messages and dialogs are collected in ``messages``.
+* ``VirtualClock`` only moves when ``advance`` is called. The stand-in
+  ``QTimer`` fires from it and game loops read their time from it, so a
+  minute of play runs in as long as the simulation takes.
+
+Each game takes an ``rng``; pass ``session.rng()`` for repeatable runs:
+
+    session = headless.install(seed=1)
+    import blocks
+    game = blocks.NukeGame(rng=session.rng())
+    session.run(60.0)
+    print(session.nuke.ops)
+
+From the command line:
+
+    python Arcade/headless.py blocks --seconds 60 --seed 1 [--profile out.csv]
+"""
+
+import argparse
+import collections
+import importlib
+import os
+import random
+import sys
+import time
+import types
+
+# Qt key codes used by the games.
+KEY_LEFT = 0x01000012
+KEY_UP = 0x01000013
+KEY_RIGHT = 0x01000014
+KEY_DOWN = 0x01000015
+KEY_SPACE = 0x20
+
+
+class VirtualClock(object):
+    """Seconds that pass only on ``advance``; fires the stand-in timers on the way."""
+
+    def __init__(self):
+        self.now = 0.0
+        self.timers = []
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        target = self.now + seconds
+        while True:
+            due = [timer for timer in self.timers if timer.active and timer.due <= target]
+            if not due:
+                break
+            timer = min(due, key=lambda t: (t.due, t.order))
+            self.now = max(self.now, timer.due)
+            timer.fire()
+        self.now = target
+
+    def reset(self):
+        self.now = 0.0
+        self.timers = []
+
+
+class Knob(object):
+    __slots__ = ('node', 'name', 'val')
+
+    def __init__(self, node, name, value=0):
+        self.node = node
+        self.name = name
+        self.val = value
+
+    def value(self):
+        self.node.nuke.record('read', self.node, self.name)
+        return self.val
+
+    getValue = value
+
+    def setValue(self, value):
+        self.node.nuke.record('write', self.node, self.name, value)
+        self.val = value
+
+
+class Node(object):
+    def __init__(self, nuke, node_class, name):
+        self.nuke = nuke
+        self.node_class = node_class
+        self._name = name
+        self._knobs = {}
+        self.deleted = False
+
+    def __getitem__(self, name):
+        knob = self._knobs.get(name)
+        if knob is None:
+            knob = self._knobs[name] = Knob(self, name, '' if name == 'label' else 0)
+        return knob
+
+    knob = __getitem__
+
+    def knobs(self):
+        return dict(self._knobs)
+
+    def name(self):
+        if self.deleted:
+            raise ValueError("PythonObject not attached to a node")
+        return self._name
+
+    def setName(self, name):
+        self._name = name
+
+    def Class(self):
+        return self.node_class
+
+    def setXYpos(self, x, y):
+        self.nuke.record('write', self, 'xypos', (x, y))
+        self['xpos'].val = x
+        self['ypos'].val = y
+
+    def xpos(self):
+        return self['xpos'].value()
+
+    def ypos(self):
+        return self['ypos'].value()
+
+
+class _NodeFactory(object):
+    def __init__(self, nuke):
+        self._nuke = nuke
+
+    def __getattr__(self, node_class):
+        return lambda **knobs: self._nuke.createNode(node_class, inpanel=False, **knobs)
+
+
+class _Undo(object):
+    def __init__(self):
+        self.disabled_depth = 0
+
+    def disable(self):
+        self.disabled_depth += 1
+
+    def enable(self):
+        self.disabled_depth = max(0, self.disabled_depth - 1)
+
+    def disabled(self):
+        return self.disabled_depth > 0
+
+
+class FakeNuke(types.ModuleType):
+    """The parts of the ``nuke`` module the games use, in memory."""
+
+    def __init__(self, record=False):
+        super(FakeNuke, self).__init__('nuke')
+        self.recording = record
+        self.nodes = _NodeFactory(self)
+        self.Undo = _Undo()
+        self.reset()
+
+    def reset(self):
+        self.all_nodes = {}  # id(node) -> node, in creation order
+        self.ops = collections.Counter()
+        self.log = []
+        self.messages = []
+        self.created = 0
+
+    def record(self, op, node, knob=None, value=None):
+        self.ops[op] += 1
+        if not self.Undo.disabled():
+            self.ops['undo'] += 1
+        if self.recording:
+            self.log.append((op, node._name, knob, value))
+
+    def createNode(self, node_class, knobs="", inpanel=True, **values):
+        self.created += 1
+        node = Node(self, node_class, values.pop('name', "%s%d" % (node_class, self.created)))
+        self.all_nodes[id(node)] = node
+        self.record('create', node)
+        for name, value in values.items():
+            node[name].val = value
+        return node
+
+    def delete(self, node):
+        self.record('delete', node)
+        self.all_nodes.pop(id(node), None)
+        node.deleted = True
+
+    def allNodes(self, filter=None):
+        return [node for node in self.all_nodes.values() if filter is None or node.node_class == filter]
+
+    def toNode(self, name):
+        for node in self.all_nodes.values():
+            if node._name == name:
+                return node
+        return None
+
+    def message(self, text):
+        self.messages.append(text)
+
+    def ask(self, text):
+        self.messages.append(text)
+        return False
+
+    def zoom(self, *args):
+        pass
+
+    def menu(self, name):
+        return None
+
+
+# --- PySide2 stand-ins ------------------------------------------------------------------------
+
+class _Signal(object):
+    def __init__(self):
+        self.slots = []
+
+    def connect(self, slot):
+        self.slots.append(slot)
+
+    def disconnect(self, slot=None):
+        self.slots = [s for s in self.slots if slot is not None and s != slot]
+
+    def emit(self, *args):
+        for slot in list(self.slots):
+            slot(*args)
+
+
+class VirtualTimer(object):
+    """A ``QTimer`` that runs on the session's ``VirtualClock``."""
+
+    clock = None
+    created = 0
+
+    def __init__(self, *args):
+        VirtualTimer.created += 1
+        self.order = VirtualTimer.created
+        self.timeout = _Signal()
+        self.interval = 0
+        self.active = False
+        self.single = False
+        self.due = 0.0
+
+    def start(self, msec=None):
+        if msec is not None:
+            self.interval = msec
+        self.active = True
+        self.due = self.clock.now + self.interval / 1000.0
+        if self not in self.clock.timers:
+            self.clock.timers.append(self)
+
+    def stop(self):
+        self.active = False
+
+    def isActive(self):
+        return self.active
+
+    def setInterval(self, msec):
+        self.interval = msec
+
+    def setSingleShot(self, single):
+        self.single = single
+
+    def setTimerType(self, timer_type):
+        pass
+
+    def fire(self):
+        if self.single:
+            self.active = False
+            self.clock.timers.remove(self)
+        else:
+            # A zero interval still has to let virtual time move on.
+            self.due += max(self.interval, 1) / 1000.0
+        self.timeout.emit()
+
+    @staticmethod
+    def singleShot(msec, slot):
+        timer = VirtualTimer()
+        timer.single = True
+        timer.timeout.connect(slot)
+        timer.start(msec)
+
+
+class QObject(object):
+    def __init__(self, *args, **kwargs):
+        pass
+
+
+class Qt(object):
+    Key_Left = KEY_LEFT
+    Key_Up = KEY_UP
+    Key_Right = KEY_RIGHT
+    Key_Down = KEY_DOWN
+    Key_Space = KEY_SPACE
+    PreciseTimer = 0
+
+
+class QEvent(object):
+    KeyPress = 6
+    KeyRelease = 7
+    ApplicationDeactivate = 122
+
+
+class QKeyEvent(QEvent):
+    def __init__(self, event_type, key, modifiers=0, text="", autorepeat=False):
+        self._type = event_type
+        self._key = key
+        self._autorepeat = autorepeat
+
+    def type(self):
+        return self._type
+
+    def key(self):
+        return self._key
+
+    def isAutoRepeat(self):
+        return self._autorepeat
+
+
+class QApplication(object):
+    _instance = None
+
+    def __init__(self, *args):
+        self.filters = []
+        QApplication._instance = self
+
+    @classmethod
+    def instance(cls):
+        return cls._instance
+
+    def installEventFilter(self, obj):
+        if obj not in self.filters:
+            self.filters.append(obj)
+
+    def removeEventFilter(self, obj):
+        if obj in self.filters:
+            self.filters.remove(obj)
+
+    def send(self, event):
+        """Offers an event to the installed filters, newest first, like Qt does."""
+        for obj in reversed(list(self.filters)):
+            if obj.eventFilter(self, event):
+                return True
+        return False
+
+
+class QMessageBox(object):
+    @staticmethod
+    def critical(parent, title, text):
+        sys.modules['nuke'].messages.append(text)
+
+
+class Session(object):
+    """What ``install`` returns: the stand-ins plus helpers to drive a run."""
+
+    def __init__(self, nuke, clock, app, seed):
+        self.nuke = nuke
+        self.clock = clock
+        self.app = app
+        self.seed = seed
+
+    def rng(self):
+        """A new random generator seeded with the session seed."""
+        return random.Random(self.seed)
+
+    def run(self, seconds):
+        """Advances virtual time by ``seconds``, firing every timer that falls due."""
+        self.clock.advance(seconds)
+
+    def press(self, key):
+        return self.app.send(QKeyEvent(QKeyEvent.KeyPress, key))
+
+    def release(self, key):
+        return self.app.send(QKeyEvent(QKeyEvent.KeyRelease, key))
+
+
+_session = None
+
+
+def install(seed=0, record=False):
+    """Installs the stand-ins, or resets them if already installed. Returns the ``Session``.
+
+    Modules imported before the first call keep whatever ``nuke`` and PySide2
+    they found, so call this before importing any game.
+    """
+    global _session
+    if _session is None:
+        clock = VirtualClock()
+        VirtualTimer.clock = clock
+        nuke = FakeNuke(record)
+        qtcore = types.ModuleType('PySide2.QtCore')
+        qtcore.QTimer = VirtualTimer
+        qtcore.QObject = QObject
+        qtcore.QEvent = QEvent
+        qtcore.Qt = Qt
+        qtgui = types.ModuleType('PySide2.QtGui')
+        qtgui.QKeyEvent = QKeyEvent
+        qtwidgets = types.ModuleType('PySide2.QtWidgets')
+        qtwidgets.QApplication = QApplication
+        qtwidgets.QMessageBox = QMessageBox
+        pyside = types.ModuleType('PySide2')
+        pyside.QtCore = qtcore
+        pyside.QtGui = qtgui
+        pyside.QtWidgets = qtwidgets
+        sys.modules.update({'nuke': nuke, 'PySide2': pyside, 'PySide2.QtCore': qtcore,
+                            'PySide2.QtGui': qtgui, 'PySide2.QtWidgets': qtwidgets})
+        import gameloop
+        gameloop.default_clock = clock
+        _session = Session(nuke, clock, QApplication(), seed)
+    else:
+        _session.clock.reset()
+        _session.nuke.reset()
+        _session.nuke.recording = record
+        _session.app.filters = []
+        inputs = sys.modules.get('inputs')
+        if inputs is not None:
+            # The filter list was emptied, so the shared key filter has to start over too.
+            inputs.InputManager._instance = None
+        # The nodes were all dropped, so nothing the games registered may outlive them: an old
+        # game would be closed, and an old grid reused, as part of the next run.
+        sessions = sys.modules.get('sessions')
+        if sessions is not None:
+            sessions._active.clear()
+        nodepool = sys.modules.get('nodepool')
+        if nodepool is not None:
+            nodepool.GridPool._pools.clear()
+        hud = sys.modules.get('hud')
+        if hud is not None:
+            hud._labels.clear()
+        _session.seed = seed
+    return _session
+
+
+# Game name -> (module, function or class that starts it).
+GAMES = {
+    'blocks': ('blocks', 'NukeGame'),
+    'monster': ('monster', 'NukeGame2'),
+    'swarm': ('monster', 'SwarmGame'),
+    'tower': ('NukeTower', 'IcyTowerGame'),
+    'doom': ('Doom4Nuke', 'Game'),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Runs a game headless and reports speed and node operations.")
+    parser.add_argument("game", choices=sorted(GAMES))
+    parser.add_argument("--seconds", type=float, default=60.0, help="game time to simulate")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--profile", metavar="CSV", help="time the frame phases and write them to CSV")
+    args = parser.parse_args()
+
+    here = os.path.dirname(os.path.abspath(__file__))
+    sys.path[:0] = [here, os.path.dirname(here)]
+    session = install(args.seed)
+    module_name, factory = GAMES[args.game]
+    options = {}
+    if args.profile:
+        import profiler
+        options['profiler'] = profiler.Profiler(csv_path=args.profile)
+    game = getattr(importlib.import_module(module_name), factory)(rng=session.rng(), **options)
+    start = time.perf_counter()
+    session.run(args.seconds)
+    elapsed = time.perf_counter() - start
+    ticks = game.loop.ticks
+    print("%s: %d ticks in %.2f s of game time, %.3f s wall (%.0f ticks/s)" % (
+        args.game, ticks, session.clock.now, elapsed, ticks / elapsed if elapsed else 0.0))
+    print("node operations: %s" % dict(session.nuke.ops))
+    for text in session.nuke.messages:
+        print("message: %s" % text)
+    if args.profile:
+        print(game.profiler.report())
+        print("frames written to %s" % game.profiler.dump_csv())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""Score display and background images for the backdrop games.
+
+Rewriting a backdrop label that holds a full-size ``<img>`` makes Nuke parse
+and lay out the image again, so the games keep the two apart:
+
+* ``background_label`` is written to the backdrop once. It points at a copy
+  of the image already scaled to the backdrop, decoded and saved once per
+  size and cached on disk between sessions. Without Qt, or if the image can't
+  be found, it falls back to the plain ``<img src=... width=...>`` label.
+* ``Hud`` is a small sticky note for the score. ``set`` only records the
+  text; ``render`` writes it when it differs from what is shown, at most once
+  every ``every`` frames.
+"""
+
+import os
+import tempfile
+
+try:
+    import nuke
+except ImportError:
+    nuke = None
+
+try:
+    from PySide2.QtCore import Qt
+    from PySide2.QtGui import QImage
+except ImportError:
+    Qt = QImage = None
+
+IMAGE_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Images")
+THUMBNAIL_FOLDER = os.path.join(tempfile.gettempdir(), "nukegames_thumbnails")
+
+# (image name, width) -> backdrop label
+_labels = {}
+
+
+def find_image(name):
+    """Path of a background image: the Images folder next to this file, then Nuke's plugin path."""
+    folders = [IMAGE_FOLDER]
+    if nuke is not None and hasattr(nuke, 'pluginPath'):
+        folders += nuke.pluginPath()
+    for folder in folders:
+        path = os.path.join(folder, name)
+        if os.path.isfile(path):
+            return path
+    return None
+
+
+def thumbnail(source, width):
+    """Path of ``source`` scaled to ``width`` pixels wide, made on first use; None if it can't be."""
+    stem = os.path.splitext(os.path.basename(source))[0]
+    path = os.path.join(THUMBNAIL_FOLDER, "%s_%d.jpg" % (stem, width))
+    if os.path.isfile(path) and os.path.getmtime(path) >= os.path.getmtime(source):
+        return path
+    image = QImage(source)
+    if image.isNull():
+        return None
+    if not os.path.isdir(THUMBNAIL_FOLDER):
+        os.makedirs(THUMBNAIL_FOLDER)
+    if not image.scaledToWidth(width, Qt.SmoothTransformation).save(path):
+        return None
+    return path
+
+
+def background_label(name, width):
+    """Backdrop label showing the image ``name`` at ``width`` pixels wide."""
+    label = _labels.get((name, width))
+    if label is None:
+        label = '<img src="%s" width="%d">' % (name, width)
+        source = find_image(name) if QImage is not None else None
+        path = thumbnail(source, width) if source is not None else None
+        if path is not None:
+            label = '<img src="%s">' % path.replace(os.sep, "/")
+        _labels[(name, width)] = label
+    return label
+
+
+class Hud(object):
+    """A sticky note showing a line of (HTML) text, rewritten only when the text changes."""
+
+    def __init__(self, renderer, x, y, text="", every=4, name="hud", font_size=24):
+        self.renderer = renderer
+        self.node = renderer.create("StickyNote", x, y, name=name, label=text, note_font_size=font_size)
+        self.every = every
+        self.text = text
+        self.shown = text
+        self.frame = 0
+        self.next_write = 0
+
+    def set(self, text):
+        self.text = text
+
+    def render(self, force=False):
+        """Writes the text if it changed and the last write is ``every`` frames back, or ``force``."""
+        self.frame += 1
+        if self.text != self.shown and (force or self.frame >= self.next_write):
+            self.renderer.set_label(self.node, self.text)
+            self.shown = self.text
+            self.next_write = self.frame + self.every
@@ -0,0 +1,143 @@
+"""Keyboard input shared by the games.
+
+Each game used to install its own application-wide event filter and never
+remove it, and moved only on the OS key-repeat events. ``InputManager`` is
+the one filter for all games instead:
+
+* ``acquire`` installs it for a game. A different game that still has it is
+  closed first (see ``sessions.close``), as it could no longer be played;
+  ``release`` takes it out again, so Nuke gets every key back once a game ends.
+* Presses and releases of the game's keys update ``held``; key-repeat events are
+  swallowed but change nothing.
+* Every step starts with ``poll``, then the game reads ``is_held`` (or
+  ``axis``), so movement follows the step rate and not the keyboard's repeat
+  rate. A key pressed since the last poll counts as held for that step even if
+  it was already let go, so a quick tap between two steps still moves.
+  ``take_pressed`` returns the keys pressed since the last call, for actions
+  that should fire once per press.
+* A ``replay.Recorder`` set as ``recorder`` is told about every key change;
+  replays feed recorded changes back in through ``key_event``.
+"""
+
+from PySide2.QtCore import QEvent, QObject, Qt
+from PySide2.QtGui import QKeyEvent
+from PySide2.QtWidgets import QApplication
+
+import sessions
+
+# Qt key codes as plain ints, so they hash the same as event.key() in sets.
+KEY_LEFT = int(Qt.Key_Left)
+KEY_UP = int(Qt.Key_Up)
+KEY_RIGHT = int(Qt.Key_Right)
+KEY_DOWN = int(Qt.Key_Down)
+KEY_SPACE = int(Qt.Key_Space)
+
+
+class InputManager(QObject):
+    """The single key filter; get it with ``InputManager.get()``."""
+
+    _instance = None
+
+    @classmethod
+    def get(cls):
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    def __init__(self):
+        super(InputManager, self).__init__()
+        self.app = QApplication.instance()
+        if not self.app:
+            self.app = QApplication([])
+        self.owner = None
+        self.keys = frozenset()
+        self.held = set()
+        self.tapped = set()  # pressed since the last poll
+        self.down = set()    # held during the current step
+        self.pressed = set()
+        self.installed = False
+        self.recorder = None
+
+    def acquire(self, owner, keys):
+        """Routes ``keys`` to ``owner`` until it releases them; closes the game that had them."""
+        if owner is not self.owner:
+            if self.owner is not None:
+                # Releases the filter and stops any recording of the earlier game.
+                sessions.close(self.owner)
+            self.stop_recording()
+        self.owner = owner
+        self.keys = frozenset(int(key) for key in keys)
+        self.clear_keys()
+        if not self.installed:
+            self.app.installEventFilter(self)
+            self.installed = True
+        return self
+
+    def release(self, owner):
+        """Removes the filter if ``owner`` still has it."""
+        if owner is not self.owner:
+            return
+        self.stop_recording()
+        self.owner = None
+        self.keys = frozenset()
+        self.clear_keys()
+        if self.installed:
+            self.app.removeEventFilter(self)
+            self.installed = False
+
+    def eventFilter(self, obj, event):
+        if isinstance(event, QKeyEvent):
+            key = int(event.key())
+            if key not in self.keys:
+                return False
+            if not event.isAutoRepeat():
+                if event.type() == QKeyEvent.KeyPress:
+                    self.key_event(key, True)
+                elif event.type() == QKeyEvent.KeyRelease:
+                    self.key_event(key, False)
+            return True
+        if event.type() == QEvent.ApplicationDeactivate:
+            # Releases made while another application has focus never reach us.
+            for key in sorted(self.held):
+                self.key_event(key, False)
+        return False
+
+    def key_event(self, key, down):
+        """Applies a press (``down``) or release of ``key``."""
+        if down:
+            self.held.add(key)
+            self.tapped.add(key)
+            self.pressed.add(key)
+        else:
+            self.held.discard(key)
+        if self.recorder is not None:
+            self.recorder.key(key, down)
+
+    def stop_recording(self):
+        if self.recorder is not None:
+            self.recorder.close()
+            self.recorder = None
+
+    def clear_keys(self):
+        self.held.clear()
+        self.tapped.clear()
+        self.down.clear()
+        self.pressed.clear()
+
+    def poll(self):
+        """Starts a step: the keys held now, or pressed since the last poll, count as held."""
+        self.down = self.held | self.tapped
+        self.tapped.clear()
+
+    def is_held(self, key):
+        return key in self.down
+
+    def axis(self, negative, positive):
+        """-1, 0 or 1 depending on which of the two keys is held."""
+        return (positive in self.down) - (negative in self.down)
+
+    def take_pressed(self):
+        """The keys pressed since the last call."""
+        pressed = self.pressed
+        self.pressed = set()
+        return pressed
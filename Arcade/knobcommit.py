@@ -0,0 +1,76 @@
+"""Per-frame batching of knob writes.
+
+Every ``setValue`` on a node is a separate Nuke operation with its own undo
+entry, so a few minutes of play used to fill the undo history. ``KnobBatch``
+collects the writes of a frame instead, keeping only the last value per knob,
+and ``flush`` applies them in one go with undo recording turned off. Writes
+that would leave a knob at the value it already has are dropped.
+"""
+
+from contextlib import contextmanager
+
+try:
+    import nuke
+except ImportError:
+    nuke = None
+
+# Pseudo knob name for a node position, applied with a single setXYpos call.
+POSITION = 'xypos'
+
+
+@contextmanager
+def undo_disabled():
+    """Runs the block without recording undo entries; nests safely."""
+    undo = getattr(nuke, 'Undo', None)
+    if undo is None or undo.disabled():
+        yield
+        return
+    undo.disable()
+    try:
+        yield
+    finally:
+        undo.enable()
+
+
+class KnobBatch(object):
+    def __init__(self):
+        self.pending = {}  # (id(node), knob) -> (node, value)
+        self.applied = {}  # id(node) -> {knob: value last written}
+
+    def __len__(self):
+        return len(self.pending)
+
+    def set(self, node, knob, value):
+        """Queues a knob write; a later write to the same knob in this frame replaces it."""
+        self.pending[(id(node), knob)] = (node, value)
+
+    def move(self, node, x, y):
+        self.pending[(id(node), POSITION)] = (node, (int(x), int(y)))
+
+    def forget(self, node):
+        """Drops everything known about a node, before it is deleted."""
+        key = id(node)
+        self.applied.pop(key, None)
+        for pending_key in [k for k in self.pending if k[0] == key]:
+            del self.pending[pending_key]
+
+    def flush(self):
+        """Applies the queued writes that change something. Returns how many were made."""
+        if not self.pending:
+            return 0
+        pending = self.pending
+        self.pending = {}
+        applied = self.applied
+        writes = 0
+        with undo_disabled():
+            for (key, knob), (node, value) in pending.items():
+                known = applied.setdefault(key, {})
+                if knob in known and known[knob] == value:
+                    continue
+                if knob == POSITION:
+                    node.setXYpos(value[0], value[1])
+                else:
+                    node[knob].setValue(value)
+                known[knob] = value
+                writes += 1
+        return writes
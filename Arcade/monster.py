@@ -3,162 +3,260 @@
 # Pray for Palestine 
 #####################################
 
-import nuke
-import random
-from PySide2.QtCore import QTimer, Qt, QObject
-from PySide2.QtWidgets import QApplication, QMessageBox
-from PySide2.QtGui import QKeyEvent
+from PySide2.QtCore import QObject
+from PySide2.QtWidgets import QMessageBox
+
+from basegame import BaseGame
+from entities import Entity, SpritePool
+from gameloop import FPS
+from hud import Hud, background_label
+from inputs import KEY_LEFT, KEY_RIGHT
+from nodepool import PARK_X, PARK_Y
+from swarm import DotSwarm, HAS_NUMPY
 
 # Define constants
 PLAYER_WIDTH = 100
 PLAYER_HEIGHT = 20
+PLAYER_SPEED = 20  # pixels per step while an arrow key is held
+
+# Backdrop dimensions and position (the game area)
+BACKDROP_X = 50
+BACKDROP_Y = 50
+BACKDROP_WIDTH = 407
+BACKDROP_HEIGHT = 793
+
+# Most dots that can be falling at once; a drop while all are in use is skipped.
+DOT_POOL_SIZE = 32
+
+# Shown instead of starting swarm mode when NumPy is missing.
+NO_NUMPY_MESSAGE = "Monster Swarm needs NumPy, which isn't installed in this Nuke."
+
+# Swarm mode: droppers, dots in flight at most, and the chance per step that a dropper drops.
+SWARM_DROPPERS = 8
+SWARM_CAPACITY = 2000
+SWARM_DROP_CHANCE = 0.5
 
 good_dot_color = 4294967295  # White
 bad_dot_color = 4278190335  # black
-class NukeGame2(QObject):
-    def __init__(self):
+class NukeGame2(BaseGame, QObject):
+    KIND = "monster"
+
+    def __init__(self, renderer=None, fps=FPS, rng=None, profiler=None):
         super(NukeGame2, self).__init__()
+        self.open_session(renderer, rng, profiler)
         self.collected_count = 0
         self.setup_game()
+        self.profiler.attach(self.renderer, (BACKDROP_X + BACKDROP_WIDTH + 20, BACKDROP_Y), type(self).__name__)
         self.monster_dx = 7  # Monster movement speed
         self.dot_dy = 5       # Dot falling speed
-        self.timer = QTimer()
-        self.timer.timeout.connect(self.update_game)
-        self.timer.start(50)
+        # Fixed 50 ms game steps, drawn at up to fps.
+        self.start_session((KEY_LEFT, KEY_RIGHT), self.update_game, self.render, fps)
+        # Drops run on game time and end with the loop.
         self.schedule_next_drop()  # Schedule first dot drop
 
     def setup_game(self):
         """Creates the game environment."""
-        self.backdrop = nuke.nodes.BackdropNode(
-            bdwidth=407,
-            bdheight=793,
-            xpos=50,
-            ypos=50,
-            label='<h1>Collected:  <font color="green"><b>0</b></font></h1>\n<img src="verticalBG.jpg" width="400">'
+        self.backdrop = self.renderer.create(
+            "BackdropNode", BACKDROP_X, BACKDROP_Y,
+            width=BACKDROP_WIDTH,
+            height=BACKDROP_HEIGHT,
+            label=background_label("verticalBG.jpg", 400)
         )
-        nuke.zoom(1, [300, 400])
-        self.player_plate = nuke.nodes.NoOp(name="Collector", hide_input=True)
-        self.player_plate['xpos'].setValue(150)
-        self.player_plate['ypos'].setValue(750)
+        # The score lives in its own small node so the backdrop image is never laid out again.
+        self.hud = Hud(self.renderer, BACKDROP_X + 10, BACKDROP_Y + 10, self.score_text(), name="Score")
+        self.renderer.zoom(1, [300, 400])
+        # Game objects keep their own state; nodes are only written to.
+        self.player_plate = Entity(self.renderer, "NoOp", 150, 750, name="Collector",
+                                   width=PLAYER_WIDTH, height=PLAYER_HEIGHT, hide_input=True)
 
-        self.monster = nuke.nodes.NoOp(name="Dropper", hide_input=True)
-        self.monster['xpos'].setValue(175)
-        self.monster['ypos'].setValue(100)
+        self.monster = Entity(self.renderer, "NoOp", 175, 100, name="Dropper", hide_input=True)
+        self.setup_dots()
 
+    def setup_dots(self):
+        """Creates the dot nodes."""
+        # Dot nodes are created once and recycled; dots that aren't falling are parked.
+        self.dot_pool = SpritePool(self.renderer, "Dot", DOT_POOL_SIZE, name="dot", hide_input=True)
         self.dots = []
 
+    def move_dropper(self, dropper, dx):
+        """Moves a dropper sideways, bouncing off the edges. Returns its new dx."""
+        new_x = dropper.x + dx
+        left_edge = BACKDROP_X
+        right_edge = BACKDROP_X + BACKDROP_WIDTH
+
+        # Bounce monster off edges
+        if new_x <= left_edge:
+            new_x = left_edge
+            dx = abs(dx)
+        elif new_x >= right_edge:
+            new_x = right_edge
+            dx = -abs(dx)
+        dropper.x = new_x
+        return dx
+
+    def poll_input(self):
+        """Moves the plate by the arrow keys held; the node catches up in the next frame."""
+        self.player_plate.x += self.inputs.axis(KEY_LEFT, KEY_RIGHT) * PLAYER_SPEED
+
     def update_game(self):
         """Moves the monster and updates dot positions."""
-        monster_x = self.monster['xpos'].value()
-        new_monster_x = monster_x + self.monster_dx
-        bd_x = self.backdrop['xpos'].value()
-        bd_width = self.backdrop['bdwidth'].value()
-        left_edge = bd_x
-        right_edge = bd_x + bd_width
+        self.monster_dx = self.move_dropper(self.monster, self.monster_dx)
 
-        # Bounce monster off edges
-        if new_monster_x <= left_edge:
-            new_monster_x = left_edge
-            self.monster_dx = abs(self.monster_dx)
-        elif new_monster_x >= right_edge:
-            new_monster_x = right_edge
-            self.monster_dx = -abs(self.monster_dx)
-        self.monster['xpos'].setValue(new_monster_x)
-
-        # Update dots
-        dots_to_remove = []
+        # Update dots; the ones still falling are kept, the rest go back to the pool.
+        falling = []
         for dot in self.dots:
-            dot_x = dot['xpos'].value()
-            dot_y = dot['ypos'].value() + self.dot_dy
-            dot['ypos'].setValue(dot_y)
-
-            # Get dot color
-            dot_color = dot['tile_color'].value()
+            dot.y += self.dot_dy
 
             # Collision with player
-            plate_x = self.player_plate['xpos'].value()
-            plate_y = self.player_plate['ypos'].value()
-            if (dot_x >= plate_x and dot_x <= plate_x + PLAYER_WIDTH and
-                dot_y >= plate_y and dot_y <= plate_y + PLAYER_HEIGHT):
+            if self.player_plate.contains(dot.x, dot.y):
                 
-                if dot_color == good_dot_color:  # White Dot (Good)
+                if dot.color == good_dot_color:  # White Dot (Good)
                     self.collected_count += 1
-                    self.backdrop['label'].setValue(f'<h1>Collected: <font color="green"><b>{self.collected_count}</b></font></h1>\n<img src="verticalBG.jpg" width="400">')
-                elif dot_color == bad_dot_color:  # Red Dot (Bad)
+                    self.hud.set(self.score_text())
+                elif dot.color == bad_dot_color:  # Red Dot (Bad)
                     self.end_game("You hit a bad dot!")
+                    return
 
-                dots_to_remove.append(dot)
+                self.dot_pool.release(dot)
+                continue
 
             # If white dot reaches the bottom, game over
-            bd_bottom = self.backdrop['ypos'].value() + self.backdrop['bdheight'].value()
-            if dot_y >= bd_bottom:
-                if dot_color == good_dot_color:  # Good dot not collected
+            bd_bottom = BACKDROP_Y + BACKDROP_HEIGHT
+            if dot.y >= bd_bottom:
+                if dot.color == good_dot_color:  # Good dot not collected
                     self.end_game("You missed a good dot!")
-                else:
-                    dots_to_remove.append(dot)  # Red dots disappear normally
+                    return
+                self.dot_pool.release(dot)  # Red dots disappear normally
+                continue
+            falling.append(dot)
+        self.dots = falling
 
-        # Remove collected and fallen dots
-        for dot in dots_to_remove:
-            if dot in self.dots:
-                self.dots.remove(dot)
-                nuke.delete(dot)
+    def score_text(self):
+        return f'Collected: <font color="green"><b>{self.collected_count}</b></font>'
+
+    def render(self, alpha=1.0):
+        """Syncs the nodes with the game state after one or more game steps."""
+        with self.profiler.phase('sprites'):
+            self.hud.render()
+            self.monster.sync(self.renderer)
+            self.player_plate.sync(self.renderer)
+            for dot in self.dots:
+                dot.sync(self.renderer)
+        with self.profiler.phase('commit'):
+            self.renderer.end_frame()
 
     def schedule_next_drop(self):
         """Schedules the next dot drop at a random time interval."""
-        drop_interval = random.randint(500, 1500)  # Random between 0.5s - 1.5s
-        self.dot_timer = QTimer()
-        self.dot_timer.singleShot(drop_interval, self.drop_dot)
+        drop_interval = self.rng.randint(500, 1500)  # Random between 0.5s - 1.5s
+        self.scheduler.after(drop_interval / 1000.0, self.drop_dot)
 
     def drop_dot(self):
         """Drops a dot with an 80% chance of being white and 20% chance of being red."""
-        dot = nuke.nodes.Dot(name="dot", hide_input=True)
-        dot['xpos'].setValue(self.monster['xpos'].value())
-        dot['ypos'].setValue(self.monster['ypos'].value())
-
         # 80% chance for white, 20% for red
-        is_white_dot = random.choices([True, False], weights=[80, 20])[0]
-        dot['tile_color'].setValue(good_dot_color if is_white_dot else bad_dot_color)  # White or Red
-
-        self.dots.append(dot)
+        is_white_dot = self.rng.choices([True, False], weights=[80, 20])[0]
+        dot_color = good_dot_color if is_white_dot else bad_dot_color  # White or Red
+        dot = self.dot_pool.acquire(self.monster.x, self.monster.y, dot_color)
+        if dot is not None:
+            self.dots.append(dot)
         self.schedule_next_drop()  # Schedule next drop
 
-    def end_game(self, message):
-        """Ends the game with a message."""
-        self.timer.stop()
-        self.dot_timer.stop()
-        QMessageBox.critical(None, "Game Over", message)
-        for dot in self.dots:
-            nuke.delete(dot)
-        self.dots.clear()
-
-
-class PlayerKeyListener(QObject):
-    def __init__(self, game):
-        super(PlayerKeyListener, self).__init__()
-        self.game = game
-        self.app = QApplication.instance()
-        if not self.app:
-            self.app = QApplication([])
-        self.app.installEventFilter(self)
-        self.move_step = 20
-
-    def eventFilter(self, obj, event):
-        if isinstance(event, QKeyEvent) and event.type() == QKeyEvent.KeyPress:
-            if event.key() == Qt.Key_Left:
-                self.move_player(-self.move_step)
-                return True
-            elif event.key() == Qt.Key_Right:
-                self.move_player(self.move_step)
-                return True
-        return False
-
-    def move_player(self, delta):
-        current_x = self.game.player_plate['xpos'].value()
-        new_x = current_x + delta
-        self.game.player_plate['xpos'].setValue(new_x)
-
-
-def start_nuke_game():
-    global game, key_listener
-    game = NukeGame2()
-    key_listener = PlayerKeyListener(game)
+
+class SwarmGame(NukeGame2):
+    """Swarm mode: several droppers and up to thousands of dots in flight at once.
+
+    Dot physics and the plate test run on NumPy arrays (see ``swarm.DotSwarm``).
+    Each array slot owns one Dot node, and only slots whose position changed are
+    written. Catching a bad dot still ends the game; missed good dots are counted.
+    """
+
+    KIND = "swarm"
+
+    def __init__(self, renderer=None, fps=FPS, rng=None, droppers=SWARM_DROPPERS, capacity=SWARM_CAPACITY,
+                 drop_chance=SWARM_DROP_CHANCE, profiler=None):
+        # Checked before any node is made, so nothing is left behind.
+        if not HAS_NUMPY:
+            raise RuntimeError(NO_NUMPY_MESSAGE)
+        self.dropper_count = droppers
+        self.capacity = capacity
+        self.drop_chance = drop_chance
+        self.missed_count = 0
+        super(SwarmGame, self).__init__(renderer, fps, rng, profiler)
+
+    def setup_dots(self):
+        """Creates the extra droppers, the dot arrays and one parked Dot node per array slot."""
+        self.droppers = [self.monster]
+        for i in range(1, self.dropper_count):
+            x = BACKDROP_X + BACKDROP_WIDTH * i // self.dropper_count
+            self.droppers.append(Entity(self.renderer, "NoOp", x, 100, name="Dropper", hide_input=True))
+        self.dropper_dx = [self.rng.choice([-7, 7]) for _ in self.droppers]
+        self.swarm = DotSwarm(self.capacity)
+        self.dot_handles = [self.renderer.create("Dot", PARK_X, PARK_Y, name="dot", hide_input=True)
+                            for _ in range(self.capacity)]
+        self.swarm.hide(None, PARK_X, PARK_Y)
+        self.dots = []
+
+    def schedule_next_drop(self):
+        """Droppers drop on game steps in swarm mode; there is nothing to schedule."""
+
+    def update_game(self):
+        """Moves the droppers, drops new dots, then moves and collision-tests all dots at once."""
+        self.dropper_dx = [self.move_dropper(dropper, dx) for dropper, dx in zip(self.droppers, self.dropper_dx)]
+
+        dropping = [dropper for dropper in self.droppers if self.rng.random() < self.drop_chance]
+        if dropping:
+            good = [self.rng.random() < 0.8 for _ in dropping]  # 80% white, 20% red
+            slots = self.swarm.spawn([d.x for d in dropping], [d.y for d in dropping],
+                                     [self.dot_dy] * len(dropping), good)
+            for slot, is_white_dot in zip(slots.tolist(), good):
+                self.renderer.set_color(self.dot_handles[slot], good_dot_color if is_white_dot else bad_dot_color)
+
+        plate = self.player_plate
+        caught_good, caught_bad, missed_good, freed = self.swarm.step(
+            (plate.x, plate.y, plate.x + PLAYER_WIDTH, plate.y + PLAYER_HEIGHT), BACKDROP_Y + BACKDROP_HEIGHT)
+        self.park(freed)
+        if caught_good or missed_good:
+            self.collected_count += caught_good
+            self.missed_count += missed_good
+            self.hud.set(self.score_text())
+        if caught_bad:
+            self.end_game("You hit a bad dot!")
+
+    def park(self, slots):
+        """Moves the nodes of freed slots out of sight."""
+        handles = self.dot_handles
+        for slot in slots.tolist():
+            self.renderer.move(handles[slot], PARK_X, PARK_Y)
+        self.swarm.hide(slots, PARK_X, PARK_Y)
+
+    def score_text(self):
+        return (f'Collected: <font color="green"><b>{self.collected_count}</b></font> '
+                f'Missed: <font color="red"><b>{self.missed_count}</b></font>')
+
+    def render(self, alpha=1.0):
+        """Syncs the droppers, the plate and the dots that moved."""
+        with self.profiler.phase('sprites'):
+            self.hud.render()
+            for dropper in self.droppers:
+                dropper.sync(self.renderer)
+            self.player_plate.sync(self.renderer)
+            slots, xs, ys = self.swarm.moved((BACKDROP_X, BACKDROP_Y, BACKDROP_X + BACKDROP_WIDTH,
+                                              BACKDROP_Y + BACKDROP_HEIGHT))
+            handles = self.dot_handles
+            move = self.renderer.move
+            for slot, x, y in zip(slots.tolist(), xs.tolist(), ys.tolist()):
+                move(handles[slot], x, y)
+        with self.profiler.phase('commit'):
+            self.renderer.end_frame()
+
+
+def start_nuke_game(renderer=None, fps=FPS, rng=None, profiler=None):
+    global game
+    game = NukeGame2(renderer, fps, rng, profiler)
+
+
+def start_swarm_game(renderer=None, fps=FPS, **options):
+    global game
+    if not HAS_NUMPY:
+        QMessageBox.critical(None, "Monster Swarm", NO_NUMPY_MESSAGE)
+        return
+    game = SwarmGame(renderer, fps, **options)
@@ -0,0 +1,102 @@
+"""Pools of Nuke nodes that are reused instead of being created and deleted.
+
+Creating nodes is by far the slowest thing the games do, so nodes that can be
+recycled are parked out of sight when unused and moved back when needed.
+"""
+
+try:
+    import nuke
+except ImportError:
+    nuke = None
+
+# Where unused nodes wait, far outside any game area.
+PARK_X = -100000
+PARK_Y = -100000
+
+
+def park(node):
+    """Moves a node out of sight."""
+    node.setXYpos(PARK_X, PARK_Y)
+
+
+def is_alive(node):
+    """False once the node behind a Python node object has been deleted."""
+    try:
+        node.name()
+    except ValueError:
+        return False
+    return True
+
+
+class GridPool(object):
+    """A named grid of Dot nodes that outlives the games drawing on it.
+
+    Cells are named '<name>_<index>', so a new session, or the same session
+    after the module was re-imported, adopts the grid already in the script
+    instead of building another one. Use ``GridPool.get`` rather than the
+    constructor so every game in this Nuke session shares one pool per name.
+    ``reads`` counts the node reads all pools have made, for the profiler.
+    """
+
+    _pools = {}
+    reads = 0
+
+    @classmethod
+    def get(cls, name):
+        pool = cls._pools.get(name)
+        if pool is not None and pool.cells:
+            GridPool.reads += 1
+        if pool is None or (pool.cells and not is_alive(pool.cells[0])):
+            pool = cls._pools[name] = cls(name)
+        return pool
+
+    def __init__(self, name):
+        self.name = name
+        self.cells = []
+        self.layout_key = None
+        self.adopt()
+
+    def adopt(self):
+        """Picks up the cells of a grid with this name that is already in the script."""
+        prefix = self.name + "_"
+        found = {}
+        nodes = nuke.allNodes("Dot")
+        GridPool.reads += len(nodes)
+        for node in nodes:
+            name = node.name()
+            suffix = name[len(prefix):]
+            if name.startswith(prefix) and suffix.isdigit():
+                found[int(suffix)] = node
+        # Only a contiguous run of cells is usable; anything after a gap is left alone.
+        while len(self.cells) in found:
+            self.cells.append(found[len(self.cells)])
+
+    def layout(self, width, height, pixel_size, origin=(0, 0)):
+        """Returns width * height cells laid out as a row-major grid.
+
+        Only the cells missing from the pool are created; cells beyond the grid
+        are parked rather than deleted so a later, larger layout can reuse them.
+        """
+        count = width * height
+        while len(self.cells) < count:
+            self.cells.append(nuke.nodes.Dot(name="%s_%d" % (self.name, len(self.cells)), hide_input=True))
+        layout_key = (width, height, pixel_size, tuple(origin))
+        if layout_key != self.layout_key:
+            for index, cell in enumerate(self.cells[:count]):
+                cell.setXYpos(int(origin[0] + (index % width) * pixel_size),
+                              int(origin[1] + (index // width) * pixel_size))
+            for cell in self.cells[count:]:
+                park(cell)
+            self.layout_key = layout_key
+        return self.cells[:count]
+
+    def destroy(self):
+        """Deletes every cell; the next ``get`` for this name starts an empty pool."""
+        GridPool.reads += len(self.cells)
+        for cell in self.cells:
+            if is_alive(cell):
+                nuke.delete(cell)
+        self.cells = []
+        self.layout_key = None
+        if GridPool._pools.get(self.name) is self:
+            del GridPool._pools[self.name]
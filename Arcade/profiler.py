@@ -0,0 +1,168 @@
+"""Frame timing for the games.
+
+A ``Profiler`` handed to a game times each phase of every frame (input,
+simulation, ray casting, sprite drawing, knob commits) and counts the knob
+reads and writes the renderer made. It keeps rolling p50/p95/p99 over the
+last ``window`` frames, can show them in a HUD node next to the game, and
+writes one CSV row per frame when the game ends, so hosts and versions can be
+compared.
+
+Games without a profiler use ``NullProfiler``, whose methods do nothing.
+"""
+
+import csv
+import os
+import tempfile
+import time
+from collections import deque
+
+# Phases every report lists, in this order; games may time others too.
+PHASES = ('input', 'simulation', 'raycast', 'sprites', 'commit')
+COUNTERS = ('knob_reads', 'knob_writes')
+PERCENTILES = (0.5, 0.95, 0.99)
+
+
+class _Phase(object):
+    __slots__ = ('profiler', 'name', 'start')
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        self.profiler.add(self.name, (time.perf_counter() - self.start) * 1000.0)
+
+
+class _NoPhase(object):
+    __slots__ = ()
+
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+class NullProfiler(object):
+    """Stands in for a profiler when a game isn't being profiled."""
+
+    _phase = _NoPhase()
+
+    def attach(self, renderer, hud_position=None, name="game"):
+        pass
+
+    def phase(self, name):
+        return self._phase
+
+    def add(self, name, ms):
+        pass
+
+    def end_frame(self, frame_ms):
+        pass
+
+    def game_over(self):
+        pass
+
+
+class Profiler(object):
+    def __init__(self, window=300, hud=False, hud_every=10, csv_path=None, history=100000):
+        """
+        window:    frames the percentiles are taken over.
+        hud:       show the report in a StickyNote next to the game.
+        hud_every: frames between HUD updates.
+        csv_path:  where ``game_over`` writes the frames; a file in the temp folder when None.
+        history:   most frames kept for the CSV.
+        """
+        self.window = window
+        self.hud = hud
+        self.hud_every = hud_every
+        self.csv_path = csv_path
+        self.renderer = None
+        self.hud_node = None
+        self.name = "game"
+        self.phases = {}
+        self.current = {}
+        self.samples = {}
+        self.columns = list(PHASES)
+        self.rows = deque(maxlen=history)
+        self.frames = 0
+        self.last_csv = None
+
+    def attach(self, renderer, hud_position=None, name="game"):
+        """Called by the game: the renderer to count knob operations of, and where the HUD goes."""
+        self.renderer = renderer
+        self.name = name
+        if self.hud and hud_position is not None:
+            self.hud_node = renderer.create("StickyNote", hud_position[0], hud_position[1],
+                                            label="profiling...")
+
+    def phase(self, name):
+        """Context manager timing one phase; a phase entered several times in a frame adds up."""
+        phase = self.phases.get(name)
+        if phase is None:
+            phase = self.phases[name] = _Phase(self, name)
+            if name not in self.columns:
+                self.columns.append(name)
+        return phase
+
+    def add(self, name, ms):
+        self.current[name] = self.current.get(name, 0.0) + ms
+
+    def end_frame(self, frame_ms):
+        """Closes the frame: records its phases, total time and knob counts."""
+        renderer = self.renderer
+        values = dict(self.current)
+        values['total'] = frame_ms
+        values['knob_reads'] = getattr(renderer, 'knob_reads', 0)
+        values['knob_writes'] = getattr(renderer, 'knob_writes', 0)
+        self.current = {}
+        for column in self.columns + ['total'] + list(COUNTERS):
+            samples = self.samples.get(column)
+            if samples is None:
+                samples = self.samples[column] = deque(maxlen=self.window)
+            samples.append(values.get(column, 0.0))
+        self.rows.append([self.frames] + [values.get(column, 0.0) for column in self.columns] +
+                         [frame_ms] + [values[counter] for counter in COUNTERS])
+        self.frames += 1
+        if self.hud_node is not None and self.frames % self.hud_every == 0:
+            renderer.set_label(self.hud_node, self.report())
+
+    def percentiles(self, column):
+        """Rolling (p50, p95, p99) of a phase, 'total' or a counter."""
+        values = sorted(self.samples.get(column, ()))
+        if not values:
+            return 0.0, 0.0, 0.0
+        return tuple(values[min(len(values) - 1, int(q * len(values)))] for q in PERCENTILES)
+
+    def report(self):
+        """The percentiles as text, one line per phase and counter."""
+        lines = ["%-12s %7s %7s %7s" % ("ms", "p50", "p95", "p99")]
+        for column in self.columns + ['total']:
+            lines.append("%-12s %7.2f %7.2f %7.2f" % ((column,) + self.percentiles(column)))
+        for counter in COUNTERS:
+            lines.append("%-12s %7d %7d %7d" % ((counter,) + self.percentiles(counter)))
+        return "\n".join(lines)
+
+    def dump_csv(self, path=None):
+        """Writes one row per recorded frame and returns the path."""
+        if path is None:
+            path = self.csv_path or os.path.join(tempfile.gettempdir(), "%s_profile.csv" % self.name)
+        with open(path, "w", newline="") as handle:
+            writer = csv.writer(handle)
+            writer.writerow(['frame'] + [column + '_ms' for column in self.columns] + ['total_ms'] + list(COUNTERS))
+            width = len(self.columns)
+            counters = len(COUNTERS)
+            for row in self.rows:
+                # Phases first seen after a row was written are missing from it.
+                phases = row[1:-counters - 1]
+                writer.writerow([row[0]] + ["%.3f" % ms for ms in phases + [0.0] * (width - len(phases))] +
+                                ["%.3f" % row[-counters - 1]] + row[-counters:])
+        self.last_csv = path
+        return path
+
+    def game_over(self):
+        if self.frames:
+            self.dump_csv()
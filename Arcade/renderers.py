@@ -0,0 +1,396 @@
+"""Render targets shared by the games.
+
+Games never talk to Nuke nodes directly; they draw through a renderer:
+
+* node style drawing (``create`` / ``move`` / ``set_color`` / ``set_label`` /
+  ``delete``) for the games whose sprites are nodes in the DAG, and
+* ``present`` for games that draw a pixel grid into a ``FrameBuffer``.
+
+``teardown`` removes everything a game drew when it is over.
+
+Colors handed to ``create`` and ``set_color`` are Nuke ``tile_color`` values
+(0xRRGGBBAA); framebuffer pixels are packed 0xAARRGGBB ints, which every
+backend shows in the same colors.
+
+Backends:
+
+* ``NodeRenderer``   - real Nuke nodes and a grid of Dot nodes (the default).
+  Knob writes are batched per frame and applied by ``end_frame``.
+* ``ImageRenderer``  - a ``NodeRenderer`` that shows the pixel grid as one PNG
+  in a backdrop label instead of a grid of Dot nodes.
+* ``ArrayRenderer``  - an in-memory framebuffer, for headless runs and profiling.
+* ``QImageRenderer`` - an ``ArrayRenderer`` that also paints into a ``QImage``,
+  optionally shown in its own window.
+"""
+
+import array
+import os
+import shutil
+import tempfile
+from collections import deque
+
+from framebuffer import FrameBuffer
+from knobcommit import KnobBatch, undo_disabled
+from nodepool import GridPool, is_alive
+from pngwriter import encode_png
+
+try:
+    import nuke
+except ImportError:
+    nuke = None
+
+# Approximate DAG footprint of the node classes the games use, for the raster backends.
+NODE_SIZES = {
+    'Dot': (12, 12),
+    'NoOp': (80, 18),
+    'Axis': (80, 18),
+}
+DEFAULT_NODE_SIZE = (80, 18)
+BACKDROP_COLOR = 0x505050FF
+
+
+def nuke_to_argb(color):
+    """Converts a Nuke tile_color (0xRRGGBBAA) into a packed 0xAARRGGBB int."""
+    color = int(color) & 0xFFFFFFFF
+    return ((color & 0xFF) << 24) | (color >> 8)
+
+
+def argb_to_nuke(color):
+    """Converts a packed 0xAARRGGBB int into a Nuke tile_color (0xRRGGBBAA)."""
+    color = int(color) & 0xFFFFFFFF
+    return ((color & 0xFFFFFF) << 8) | (color >> 24)
+
+
+class Renderer(object):
+    """Interface every backend implements. Handles returned by ``create`` are opaque."""
+
+    def create(self, node_class, x, y, name=None, color=None, label=None, width=None, height=None, **knobs):
+        """Creates a sprite of the given node class at (x, y) and returns its handle.
+
+        ``width``/``height`` size backdrops; other classes use their natural size.
+        Extra keyword arguments are passed on as knob values.
+        """
+        raise NotImplementedError
+
+    def move(self, handle, x, y):
+        raise NotImplementedError
+
+    def position(self, handle):
+        """Returns the (x, y) position of a sprite."""
+        raise NotImplementedError
+
+    def set_color(self, handle, color):
+        raise NotImplementedError
+
+    def set_label(self, handle, text):
+        raise NotImplementedError
+
+    def delete(self, handle):
+        raise NotImplementedError
+
+    def setup_grid(self, width, height, pixel_size, origin=(0, 0), name="grid"):
+        """Prepares a width x height pixel grid for ``present``.
+
+        Backends that keep the grid around between games share it by ``name``.
+        """
+        raise NotImplementedError
+
+    def present(self, framebuffer):
+        """Displays the cells of ``framebuffer`` that changed; returns how many were written."""
+        raise NotImplementedError
+
+    def zoom(self, scale, center):
+        """Frames the view on the game area. Backends without a view ignore it."""
+        pass
+
+    def end_frame(self):
+        """Called once at the end of every rendered frame."""
+        pass
+
+    def teardown(self, keep_grid=False):
+        """Deletes every sprite made by ``create``, and the pixel grid unless ``keep_grid``."""
+        raise NotImplementedError
+
+
+class NodeRenderer(Renderer):
+    """Draws with real Nuke nodes; the pixel grid is a grid of Dot nodes.
+
+    ``move``, ``set_color``, ``set_label`` and ``present`` only queue knob writes;
+    ``end_frame`` applies them in one batch that stays off the undo stack.
+    Creating and deleting nodes isn't recorded for undo either. Every node
+    ``create`` makes is kept in ``nodes`` until deleted, so ``teardown`` can
+    remove whatever a game leaves behind.
+    """
+
+    def __init__(self):
+        self.nodes = {}  # id(node) -> node, for every node created and not yet deleted
+        self.grid_cells = []
+        self.grid_name = None
+        self.batch = KnobBatch()
+        self.knob_writes = 0  # knob writes made by the last end_frame
+        self.knob_reads = 0   # knob reads made in the frame the last end_frame closed
+        self.frame_reads = 0
+
+    def create(self, node_class, x, y, name=None, color=None, label=None, width=None, height=None, **knobs):
+        if name is not None:
+            knobs['name'] = name
+        if color is not None:
+            knobs['tile_color'] = color
+        if label is not None:
+            knobs['label'] = label
+        if node_class == 'BackdropNode':
+            if width is not None:
+                knobs['bdwidth'] = width
+            if height is not None:
+                knobs['bdheight'] = height
+        with undo_disabled():
+            node = getattr(nuke.nodes, node_class)(**knobs)
+            node.setXYpos(int(x), int(y))
+        self.nodes[id(node)] = node
+        return node
+
+    def move(self, handle, x, y):
+        self.batch.move(handle, x, y)
+
+    def read(self, handle, knob):
+        """Returns a knob's value. Reading knobs is slow in Nuke, so every read is counted."""
+        self.frame_reads += 1
+        return handle[knob].value()
+
+    def position(self, handle):
+        return self.read(handle, 'xpos'), self.read(handle, 'ypos')
+
+    def set_color(self, handle, color):
+        self.batch.set(handle, 'tile_color', color)
+
+    def set_label(self, handle, text):
+        self.batch.set(handle, 'label', text)
+
+    def delete(self, handle):
+        self.batch.forget(handle)
+        self.nodes.pop(id(handle), None)
+        with undo_disabled():
+            nuke.delete(handle)
+
+    def setup_grid(self, width, height, pixel_size, origin=(0, 0), name="grid"):
+        # Flat, row-major list of Dot nodes matching the framebuffer layout, taken from a
+        # pool that reuses the grid of an earlier game instead of building a new one.
+        reads = GridPool.reads
+        with undo_disabled():
+            self.grid_cells = GridPool.get(name).layout(width, height, pixel_size, origin)
+        self.frame_reads += GridPool.reads - reads
+        self.grid_name = name
+
+    def present(self, framebuffer):
+        cells = self.grid_cells
+        pixels = framebuffer.pixels
+        dirty = framebuffer.swap()
+        for i in dirty:
+            self.batch.set(cells[i], 'tile_color', argb_to_nuke(pixels[i]))
+        return len(dirty)
+
+    def zoom(self, scale, center):
+        nuke.zoom(scale, center)
+
+    def end_frame(self):
+        self.knob_writes = self.batch.flush()
+        self.knob_reads = self.frame_reads
+        self.frame_reads = 0
+
+    def teardown(self, keep_grid=False):
+        # Writes still queued are for nodes about to go.
+        self.batch = KnobBatch()
+        with undo_disabled():
+            for node in self.nodes.values():
+                if is_alive(node):
+                    nuke.delete(node)
+            if self.grid_name is not None and not keep_grid:
+                GridPool.get(self.grid_name).destroy()
+        self.nodes = {}
+        self.grid_cells = []
+
+
+class ImageRenderer(NodeRenderer):
+    """A ``NodeRenderer`` whose pixel grid is a single image rather than a grid of Dots.
+
+    ``present`` encodes a changed frame as a PNG in a temp folder and points the
+    label of one backdrop at it, so a frame costs one encode and one knob write
+    at any resolution, and no grid has to be built. Each frame is written under
+    a new name so Nuke can't show a cached image; only the last ``keep`` files
+    are kept on disk.
+    """
+
+    def __init__(self, folder=None, keep=2):
+        super(ImageRenderer, self).__init__()
+        self.folder = folder  # a new temp folder on the first frame when None
+        self.keep = keep
+        self.files = deque()
+        self.frame = 0
+        self.screen = None
+        self.screen_size = (0, 0)
+
+    def setup_grid(self, width, height, pixel_size, origin=(0, 0), name="grid"):
+        size = (int(round(width * pixel_size)), int(round(height * pixel_size)))
+        if self.screen is None:
+            reads = GridPool.reads
+            with undo_disabled():
+                # A Dot grid left in the script by an earlier game would cover the image.
+                GridPool.get(name).destroy()
+            self.frame_reads += GridPool.reads - reads
+            self.screen = self.create("BackdropNode", origin[0], origin[1], name=name + "_screen", label="",
+                                      width=size[0], height=size[1], z_order=1)
+        elif size != self.screen_size:
+            self.batch.set(self.screen, 'bdwidth', size[0])
+            self.batch.set(self.screen, 'bdheight', size[1])
+        self.screen_size = size
+
+    def present(self, framebuffer):
+        if not framebuffer.swap():
+            return 0
+        if self.folder is None:
+            self.folder = tempfile.mkdtemp(prefix="nukegames_")
+        path = os.path.join(self.folder, "frame_%d.png" % self.frame)
+        self.frame += 1
+        with open(path, "wb") as handle:
+            handle.write(encode_png(framebuffer.pixels, framebuffer.width, framebuffer.height))
+        self.files.append(path)
+        while len(self.files) > self.keep:
+            os.remove(self.files.popleft())
+        self.batch.set(self.screen, 'label', '<img src="%s" width="%d" height="%d">' % (
+            path.replace(os.sep, "/"), self.screen_size[0], self.screen_size[1]))
+        return 1
+
+    def teardown(self, keep_grid=False):
+        super(ImageRenderer, self).teardown(keep_grid)
+        self.screen = None
+        self.close()
+
+    def close(self):
+        """Deletes the frame files."""
+        if self.folder is not None:
+            shutil.rmtree(self.folder, ignore_errors=True)
+            self.folder = None
+        self.files.clear()
+
+
+class _Sprite(object):
+    __slots__ = ('node_class', 'x', 'y', 'width', 'height', 'color', 'label', 'name')
+
+
+class ArrayRenderer(Renderer):
+    """Keeps everything in memory; nothing is shown.
+
+    With a pixel grid, ``framebuffer`` mirrors the game's framebuffer. Otherwise
+    every ``end_frame`` rasterizes the sprites into ``framebuffer``, one pixel per
+    ``cell`` x ``cell`` DAG units of the ``size`` area.
+    """
+
+    def __init__(self, size=(1000, 1000), cell=10, background=0xFF000000):
+        self.size = size
+        self.cell = cell
+        self.background = background
+        self.sprites = []
+        self.grid = False
+        self.framebuffer = FrameBuffer(size[0] // cell, size[1] // cell, background)
+
+    def create(self, node_class, x, y, name=None, color=None, label=None, width=None, height=None, **knobs):
+        sprite = _Sprite()
+        natural_width, natural_height = NODE_SIZES.get(node_class, DEFAULT_NODE_SIZE)
+        sprite.node_class = node_class
+        sprite.x = x
+        sprite.y = y
+        sprite.width = width if width is not None else natural_width
+        sprite.height = height if height is not None else natural_height
+        if color is None:
+            color = BACKDROP_COLOR if node_class == 'BackdropNode' else 0xFFFFFFFF
+        sprite.color = color
+        sprite.label = label
+        sprite.name = name
+        self.sprites.append(sprite)
+        return sprite
+
+    def move(self, handle, x, y):
+        handle.x = x
+        handle.y = y
+
+    def position(self, handle):
+        return handle.x, handle.y
+
+    def set_color(self, handle, color):
+        handle.color = color
+
+    def set_label(self, handle, text):
+        handle.label = text
+
+    def delete(self, handle):
+        self.sprites.remove(handle)
+
+    def teardown(self, keep_grid=False):
+        self.sprites = []
+        if not keep_grid:
+            self.grid = False
+
+    def setup_grid(self, width, height, pixel_size, origin=(0, 0), name="grid"):
+        self.grid = True
+        self.framebuffer = FrameBuffer(width, height, self.background)
+
+    def present(self, framebuffer):
+        pixels = self.framebuffer.pixels
+        source = framebuffer.pixels
+        dirty = framebuffer.swap()
+        for i in dirty:
+            pixels[i] = source[i]
+        return len(dirty)
+
+    def end_frame(self):
+        if not self.grid:
+            self.rasterize()
+
+    def rasterize(self):
+        """Paints all sprites, backdrops first, into ``framebuffer``."""
+        framebuffer = self.framebuffer
+        framebuffer.clear(self.background)
+        cell = float(self.cell)
+        backdrops = [sprite for sprite in self.sprites if sprite.node_class == 'BackdropNode']
+        others = [sprite for sprite in self.sprites if sprite.node_class != 'BackdropNode']
+        for sprite in backdrops + others:
+            left = max(0, int(sprite.x / cell))
+            top = max(0, int(sprite.y / cell))
+            right = min(framebuffer.width, int((sprite.x + sprite.width) / cell) + 1)
+            bottom = min(framebuffer.height, int((sprite.y + sprite.height) / cell) + 1)
+            if left >= right:
+                continue
+            color = nuke_to_argb(sprite.color)
+            for col in range(left, right):
+                framebuffer.fill_column(col, top, bottom, color)
+
+
+class QImageRenderer(ArrayRenderer):
+    """An ``ArrayRenderer`` that converts each frame into ``image`` (a ``QImage``).
+
+    With ``show=True`` the image is also displayed in a window, scaled by ``scale``.
+    """
+
+    def __init__(self, size=(1000, 1000), cell=10, background=0xFF000000, show=False, scale=4):
+        super(QImageRenderer, self).__init__(size, cell, background)
+        from PySide2.QtGui import QImage, QPixmap
+        self._QImage = QImage
+        self._QPixmap = QPixmap
+        self.scale = scale
+        self.image = None
+        self.window = None
+        if show:
+            from PySide2.QtWidgets import QLabel
+            self.window = QLabel()
+            self.window.setWindowTitle("Nuke Games")
+            self.window.show()
+
+    def end_frame(self):
+        super(QImageRenderer, self).end_frame()
+        framebuffer = self.framebuffer
+        data = array.array('I', framebuffer.pixels).tobytes()
+        self.image = self._QImage(data, framebuffer.width, framebuffer.height,
+                                  self._QImage.Format_RGB32).copy()
+        if self.window is not None:
+            self.window.setPixmap(self._QPixmap.fromImage(
+                self.image.scaled(framebuffer.width * self.scale, framebuffer.height * self.scale)))
@@ -0,0 +1,217 @@
+"""Recording a game's keys, and replaying them headless faster than real time.
+
+Every game draws its randomness from the ``rng`` it was given and runs on
+fixed steps, so the seed plus the keys and the steps they took effect on
+are enough to play a session again exactly. A log is a small binary file:
+
+* header: ``b"NKRP"``, format version (u8), seed (u64), then the game name as
+  a u8 length and ASCII bytes;
+* then 9 bytes per key change: step (u32), Qt key code (u32), 1 for a press
+  or 0 for a release (u8).
+
+All integers are little-endian. A ``Recorder`` appends to the file as keys change
+and closes it when the game releases the keyboard. The log then ends at the
+first game over; if Doom4Nuke is restarted there, the new game isn't recorded.
+Game options other than the seed, such as ``fps`` or ``adaptive``, aren't stored
+and must be passed again when replaying.
+
+Record in Nuke:
+
+    import replay
+    replay.record_game('tower', '/tmp/tower.nkrp')
+
+Replay from the command line:
+
+    python Arcade/replay.py /tmp/tower.nkrp [--profile out.csv]
+
+The replay prints an outcome digest. It hashes the final state of every node
+and the messages shown, so a change that should only affect speed can be
+checked against the same log before and after.
+"""
+
+import argparse
+import hashlib
+import importlib
+import os
+import random
+import struct
+import sys
+import time
+
+from headless import GAMES, install
+
+MAGIC = b"NKRP"
+VERSION = 1
+HEADER = struct.Struct("<4sBQB")  # magic, version, seed, length of the game name
+RECORD = struct.Struct("<IIB")    # step, key, pressed
+
+
+class Log(object):
+    """A recorded session: the game, its seed and its key changes as (step, key, down)."""
+
+    def __init__(self, game, seed, records=None):
+        if game not in GAMES:
+            raise ValueError("unknown game %r; expected one of %s" % (game, ", ".join(sorted(GAMES))))
+        self.game = game
+        self.seed = seed
+        self.records = records if records is not None else []
+
+    def header(self):
+        name = self.game.encode("ascii")
+        return HEADER.pack(MAGIC, VERSION, self.seed, len(name)) + name
+
+    def to_bytes(self):
+        return self.header() + b"".join(RECORD.pack(tick, key, down) for tick, key, down in self.records)
+
+    @classmethod
+    def from_bytes(cls, data):
+        if len(data) < HEADER.size:
+            raise ValueError("not a replay log: %d bytes is shorter than the header" % len(data))
+        magic, version, seed, name_length = HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise ValueError("not a replay log: bad magic %r" % (magic,))
+        if version != VERSION:
+            raise ValueError("unsupported replay log version %d" % version)
+        start = HEADER.size + name_length
+        game = data[HEADER.size:start].decode("ascii")
+        body = len(data) - start
+        # A recording cut short mid-record keeps the records that made it to disk.
+        count = body // RECORD.size
+        records = [(tick, key, bool(down)) for tick, key, down in
+                   RECORD.iter_unpack(data[start:start + count * RECORD.size])]
+        return cls(game, seed, records)
+
+    def save(self, path):
+        with open(path, "wb") as handle:
+            handle.write(self.to_bytes())
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as handle:
+            return cls.from_bytes(handle.read())
+
+
+class Recorder(object):
+    """Logs the key changes a game's ``InputManager`` sees, stamped with the step they apply to."""
+
+    def __init__(self, game_name, seed, path=None):
+        self.log = Log(game_name, seed)
+        self.loop = None
+        self.stream = open(path, "wb") if path is not None else None
+        if self.stream is not None:
+            self.stream.write(self.log.header())
+            self.stream.flush()
+
+    def attach(self, game):
+        """Starts recording ``game``, which must have been created with ``random.Random(seed)``."""
+        self.loop = game.loop
+        game.inputs.recorder = self
+        return self
+
+    def key(self, key, down):
+        # Keys that arrive between steps are first polled by the next step, the one numbered ticks.
+        record = (self.loop.ticks, key, down)
+        self.log.records.append(record)
+        if self.stream is not None:
+            self.stream.write(RECORD.pack(*record))
+            self.stream.flush()
+
+    def close(self):
+        if self.stream is not None:
+            self.stream.close()
+            self.stream = None
+
+
+class Player(object):
+    """Feeds a log's key changes to a game, each just before the step it was recorded at."""
+
+    def __init__(self, log, game):
+        self.records = log.records
+        self.index = 0
+        self.inputs = game.inputs
+        self.loop = game.loop
+        self.poll = self.loop.poll
+        self.loop.poll = self.step
+
+    def step(self):
+        records = self.records
+        tick = self.loop.ticks
+        while self.index < len(records) and records[self.index][0] <= tick:
+            _, key, down = records[self.index]
+            self.inputs.key_event(key, down)
+            self.index += 1
+        if self.poll is not None:
+            self.poll()
+
+
+def create_game(name, rng, **options):
+    module_name, factory = GAMES[name]
+    return getattr(importlib.import_module(module_name), factory)(rng=rng, **options)
+
+
+def record_game(name, path, seed=None, **options):
+    """Starts the named game with a fresh seed, recording its keys to ``path``. Returns the game."""
+    if seed is None:
+        seed = random.randrange(1 << 32)
+    game = create_game(name, random.Random(seed), **options)
+    Recorder(name, seed, path).attach(game)
+    return game
+
+
+def digest(session, game):
+    """Hash of the steps run, the messages shown and the final state of every node."""
+    sha = hashlib.sha1()
+    sha.update(repr((game.loop.ticks, session.nuke.messages)).encode("utf-8"))
+    for node in session.nuke.all_nodes.values():
+        # The knobs are read directly so hashing doesn't show up in the op counts.
+        state = (node.node_class, node._name) + tuple(
+            node._knobs[name].val if name in node._knobs else None
+            for name in ('xpos', 'ypos', 'tile_color', 'label'))
+        sha.update(repr(state).encode("utf-8"))
+    return sha.hexdigest()
+
+
+def replay(log, max_seconds=3600.0, chunk=1.0, **options):
+    """Plays ``log`` headless until the game stops or ``max_seconds`` of game time pass.
+
+    Returns ``(session, game)``. Installs the headless stand-ins, so in a plain
+    Python process call it before any game module is imported.
+    """
+    session = install(log.seed)
+    game = create_game(log.game, session.rng(), **options)
+    Player(log, game)
+    while game.loop.running and session.clock.now < max_seconds:
+        session.run(min(chunk, max_seconds - session.clock.now))
+    return session, game
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replays a recorded session headless.")
+    parser.add_argument("log", help="a log written by replay.record_game")
+    parser.add_argument("--seconds", type=float, default=3600.0, help="most game time to replay")
+    parser.add_argument("--profile", metavar="CSV", help="time the frame phases and write them to CSV")
+    args = parser.parse_args()
+
+    log = Log.load(args.log)
+    options = {}
+    if args.profile:
+        import profiler
+        options['profiler'] = profiler.Profiler(csv_path=args.profile)
+    start = time.perf_counter()
+    session, game = replay(log, args.seconds, **options)
+    elapsed = time.perf_counter() - start
+    print("%s seed %d: %d key changes, %d steps, %.2f s of game time in %.3f s (%.0fx real time)" % (
+        log.game, log.seed, len(log.records), game.loop.ticks, session.clock.now, elapsed,
+        session.clock.now / elapsed if elapsed else 0.0))
+    print("node operations: %s" % dict(session.nuke.ops))
+    for text in session.nuke.messages:
+        print("message: %s" % text)
+    print("outcome digest: %s" % digest(session, game))
+    if args.profile:
+        print(game.profiler.report())
+
+
+if __name__ == "__main__":
+    here = os.path.dirname(os.path.abspath(__file__))
+    sys.path[:0] = [here, os.path.dirname(here)]
+    main()
@@ -0,0 +1,84 @@
+"""Delayed and repeating game events on game time.
+
+Games used to start a Qt single-shot timer for every delayed action. Those
+timers ran on wall time, could not be cancelled once started, and kept
+firing after the game had ended. A ``Scheduler`` instead keeps the pending
+events in a heap keyed by game time. Its game loop moves it forward one step
+at a time (see ``gameloop.GameLoop``), so events:
+
+* fire between steps, in order of due time and then of scheduling;
+* come out the same in every run, because game time only moves with the steps;
+* are all dropped by ``clear`` when the loop stops.
+
+Cancelling an event only marks it; the heap drops it when it comes up.
+"""
+
+import heapq
+import itertools
+
+
+class Event(object):
+    """A scheduled callback; pass it to ``Scheduler.cancel`` to call it off."""
+
+    __slots__ = ('callback', 'args', 'interval')
+
+    def __init__(self, callback, args, interval):
+        self.callback = callback
+        self.args = args
+        self.interval = interval
+
+    @property
+    def cancelled(self):
+        return self.callback is None
+
+
+class Scheduler(object):
+    def __init__(self):
+        self.now = 0.0  # game seconds since the scheduler was created
+        self.queue = []  # (due, order, event)
+        self.order = itertools.count()
+
+    def __len__(self):
+        return sum(1 for _, _, event in self.queue if not event.cancelled)
+
+    def after(self, delay, callback, *args):
+        """Calls ``callback(*args)`` once, ``delay`` game seconds from now."""
+        return self._push(self.now + delay, Event(callback, args, None))
+
+    def every(self, interval, callback, *args):
+        """Calls ``callback(*args)`` every ``interval`` game seconds, starting one interval from now."""
+        if interval <= 0:
+            raise ValueError("interval must be positive, got %r" % (interval,))
+        return self._push(self.now + interval, Event(callback, args, interval))
+
+    def _push(self, due, event):
+        heapq.heappush(self.queue, (due, next(self.order), event))
+        return event
+
+    def cancel(self, event):
+        event.callback = None
+        event.args = ()
+
+    def clear(self):
+        """Cancels every pending event."""
+        for _, _, event in self.queue:
+            self.cancel(event)
+        self.queue = []
+
+    def advance(self, seconds):
+        """Moves game time on by ``seconds`` and runs the events that fell due.
+
+        An event an earlier one schedules runs in the same call if it is already due.
+        """
+        self.now += seconds
+        # Steps add up in floating point; don't let rounding push an event into the next step.
+        limit = self.now + 1e-9
+        queue = self.queue
+        while queue and queue[0][0] <= limit:
+            due, _, event = heapq.heappop(queue)
+            callback = event.callback
+            if callback is None:
+                continue
+            if event.interval is not None:
+                self._push(due + event.interval, event)
+            callback(*event.args)
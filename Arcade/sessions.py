@@ -0,0 +1,46 @@
+"""One session per game type, and cleaning up after a game.
+
+Every node a game makes goes through its renderer, which keeps track of
+them (see ``renderers.NodeRenderer``). When a game is over, ``close`` stops
+its loop and scheduled events, gives the keyboard back and deletes all of
+its nodes in one undo-free pass, so the script doesn't grow with every play.
+
+A game calls ``begin`` as it starts: an earlier game of the same type that is
+still around is closed, keeping its pixel grid for the new game to reuse.
+Once it is fully set up it calls ``started``, so a game whose constructor
+failed is never the one the next start has to close.
+"""
+
+# Game type -> the game currently running it.
+_active = {}
+
+
+def begin(kind, game):
+    """Closes the earlier game of this type, keeping its pixel grid for ``game``."""
+    previous = _active.get(kind)
+    if previous is not None and previous is not game:
+        close(previous, keep_grid=True)
+
+
+def started(kind, game):
+    """Makes ``game`` the running game of its type; called once it is fully set up."""
+    _active[kind] = game
+
+
+def close(game, keep_grid=False):
+    """Ends ``game`` and deletes its nodes; the pixel grid too unless ``keep_grid``.
+
+    Parts a half-built game never got are skipped.
+    """
+    loop = getattr(game, 'loop', None)
+    if loop is not None:
+        loop.stop()
+    inputs = getattr(game, 'inputs', None)
+    if inputs is not None:
+        inputs.release(game)
+    renderer = getattr(game, 'renderer', None)
+    if renderer is not None:
+        renderer.teardown(keep_grid)
+    for kind, running in list(_active.items()):
+        if running is game:
+            del _active[kind]
@@ -0,0 +1,195 @@
+"""Grid helpers for games with many moving objects.
+
+* ``SpatialHash`` buckets objects by uniform grid cell, so proximity and
+  region queries only look at the objects in the cells they overlap.
+* ``FlowField`` stores, for every cell of a tile map, the next cell on a
+  shortest path to a goal. Any number of agents can follow it at O(1) each.
+* ``sweep_box`` finds where a moving point first enters a box, for collisions
+  that must not tunnel through thin objects at high speed.
+* ``sector_box`` bounds a view or aiming cone, for querying a ``SpatialHash``.
+"""
+
+import math
+from collections import deque
+
+
+class SpatialHash(object):
+    """Uniform grid of buckets. Objects are points or axis-aligned boxes.
+
+    Objects are tracked by identity, so unhashable ones (dicts) work too.
+    """
+
+    def __init__(self, cell_size):
+        self.cell_size = float(cell_size)
+        self.buckets = {}   # cell -> {id(obj): obj}
+        self.cells = {}     # id(obj) -> cells the object is in
+
+    def __len__(self):
+        return len(self.cells)
+
+    def cell(self, x, y):
+        return int(math.floor(x / self.cell_size)), int(math.floor(y / self.cell_size))
+
+    def cell_range(self, x0, y0, x1, y1):
+        """All cells overlapping the box (x0, y0)-(x1, y1)."""
+        left, top = self.cell(min(x0, x1), min(y0, y1))
+        right, bottom = self.cell(max(x0, x1), max(y0, y1))
+        return [(cx, cy) for cy in range(top, bottom + 1) for cx in range(left, right + 1)]
+
+    def insert(self, obj, x, y, width=0, height=0):
+        """Adds an object at a point, or covering the box (x, y)-(x + width, y + height)."""
+        cells = self.cell_range(x, y, x + width, y + height)
+        key = id(obj)
+        self.cells[key] = cells
+        for cell in cells:
+            self.buckets.setdefault(cell, {})[key] = obj
+
+    def remove(self, obj):
+        key = id(obj)
+        for cell in self.cells.pop(key, ()):
+            bucket = self.buckets[cell]
+            del bucket[key]
+            if not bucket:
+                del self.buckets[cell]
+
+    def move(self, obj, x, y):
+        """Re-buckets a point object; a no-op while it stays in the same cell."""
+        cells = self.cells.get(id(obj))
+        if cells is not None and len(cells) == 1 and cells[0] == self.cell(x, y):
+            return
+        self.remove(obj)
+        self.insert(obj, x, y)
+
+    def clear(self):
+        self.buckets.clear()
+        self.cells.clear()
+
+    def query_rect(self, x0, y0, x1, y1):
+        """Objects in the cells overlapping the box, each once. Callers do the exact test."""
+        found = {}
+        buckets = self.buckets
+        for cell in self.cell_range(x0, y0, x1, y1):
+            bucket = buckets.get(cell)
+            if bucket:
+                found.update(bucket)
+        return list(found.values())
+
+
+def sweep_box(x, y, dx, dy, left, top, right, bottom):
+    """First contact of the point (x, y) moving by (dx, dy) with the box (left, top)-(right, bottom).
+
+    Returns (t, axis) where t in [0, 1] is the fraction of the motion done at
+    contact and axis is 0 for a left/right side (reflect dx) or 1 for a
+    top/bottom side (reflect dy). Returns None if the point misses the box or
+    is only moving away from it.
+    """
+    t_enter = -float('inf')
+    t_exit = float('inf')
+    axis = None
+    for origin, delta, low, high, side in ((x, dx, left, right, 0), (y, dy, top, bottom, 1)):
+        if delta == 0:
+            if origin < low or origin > high:
+                return None
+            continue
+        t0 = (low - origin) / float(delta)
+        t1 = (high - origin) / float(delta)
+        if t0 > t1:
+            t0, t1 = t1, t0
+        if t0 > t_enter:
+            t_enter = t0
+            axis = side
+        t_exit = min(t_exit, t1)
+    if axis is None or t_enter > t_exit or t_enter > 1 or t_exit <= 0:
+        return None
+    return max(t_enter, 0.0), axis
+
+
+def sector_box(x, y, angle, half_angle, radius):
+    """Bounding box (left, top, right, bottom) of the circular sector of ``radius`` around (x, y).
+
+    The sector spans ``angle`` +- ``half_angle`` radians. Besides the apex and
+    the two ends of the arc, the box takes in every point where the arc crosses
+    an axis direction, so it holds the whole bulge of the arc.
+    """
+    start = angle - half_angle
+    end = angle + half_angle
+    angles = [start, end]
+    # Multiples of pi/2 between the two edges of the arc.
+    quarter = math.ceil(start / (math.pi / 2))
+    while quarter * math.pi / 2 <= end and len(angles) < 6:
+        angles.append(quarter * math.pi / 2)
+        quarter += 1
+    xs = [x] + [x + math.cos(a) * radius for a in angles]
+    ys = [y] + [y + math.sin(a) * radius for a in angles]
+    return min(xs), min(ys), max(xs), max(ys)
+
+
+# Neighbour offsets: straight moves first so ties prefer them over diagonals.
+NEIGHBOURS = [(1, 0), (-1, 0), (0, 1), (0, -1), (1, 1), (1, -1), (-1, 1), (-1, -1)]
+
+
+class FlowField(object):
+    """Breadth-first flow field over a tile map of strings.
+
+    Cells equal to ``wall`` are blocked. Diagonal steps are allowed unless they
+    would cut the corner of a wall. ``update`` only recomputes when the goal
+    moves to another cell.
+    """
+
+    def __init__(self, map_data, wall="1"):
+        self.width = len(map_data[0])
+        self.height = len(map_data)
+        self.open = [cell != wall for row in map_data for cell in row]
+        self.goal = None
+        self.distance = []
+        self.next_cell = []
+
+    def is_open(self, cx, cy):
+        return 0 <= cx < self.width and 0 <= cy < self.height and self.open[cy * self.width + cx]
+
+    def update(self, x, y):
+        """Points the field at the cell containing (x, y). Returns True if it was recomputed."""
+        goal = (int(math.floor(x)), int(math.floor(y)))
+        if goal == self.goal:
+            return False
+        self.goal = goal
+        width = self.width
+        distance = [-1] * (width * self.height)
+        next_cell = [None] * (width * self.height)
+        if 0 <= goal[0] < width and 0 <= goal[1] < self.height:
+            distance[goal[1] * width + goal[0]] = 0
+            queue = deque([goal])
+            while queue:
+                cx, cy = queue.popleft()
+                step = distance[cy * width + cx] + 1
+                for dx, dy in NEIGHBOURS:
+                    nx, ny = cx + dx, cy + dy
+                    if not self.is_open(nx, ny) or distance[ny * width + nx] != -1:
+                        continue
+                    if dx and dy and not (self.is_open(cx + dx, cy) and self.is_open(cx, cy + dy)):
+                        continue  # Don't cut wall corners.
+                    distance[ny * width + nx] = step
+                    # Walking the BFS tree backwards: from (nx, ny) the next cell is (cx, cy).
+                    next_cell[ny * width + nx] = (cx, cy)
+                    queue.append((nx, ny))
+        self.distance = distance
+        self.next_cell = next_cell
+        return True
+
+    def direction(self, x, y):
+        """Unit vector from (x, y) toward the center of the next cell on the path.
+
+        Returns None in the goal cell, and for cells the goal can't be reached from.
+        """
+        cx, cy = int(math.floor(x)), int(math.floor(y))
+        if not (0 <= cx < self.width and 0 <= cy < self.height):
+            return None
+        target = self.next_cell[cy * self.width + cx]
+        if target is None:
+            return None
+        dx = target[0] + 0.5 - x
+        dy = target[1] + 0.5 - y
+        length = math.sqrt(dx*dx + dy*dy)
+        if length == 0:
+            return None
+        return dx / length, dy / length
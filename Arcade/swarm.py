@@ -0,0 +1,90 @@
+"""Falling dots for the monster game's swarm mode, stored as NumPy arrays.
+
+``DotSwarm`` keeps one slot per dot in column arrays (position, fall speed,
+good/bad flag, active flag), so a step integrates and collision-tests every
+dot at once instead of looping over thousands of Python objects. Slot ``i``
+always maps to the same display node; ``moved`` reports only the slots whose
+on-screen position changed, so the game writes just those.
+
+Nothing here touches Nuke. NumPy is required; ``HAS_NUMPY`` says whether it
+is installed.
+"""
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+HAS_NUMPY = np is not None
+
+
+class DotSwarm(object):
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.x = np.zeros(capacity)
+        self.y = np.zeros(capacity)
+        self.vy = np.zeros(capacity)
+        self.good = np.zeros(capacity, dtype=bool)
+        self.active = np.zeros(capacity, dtype=bool)
+        # Integer position last written to each slot's node; the int64 minimum until first shown.
+        self.shown_x = np.full(capacity, np.iinfo(np.int64).min, dtype=np.int64)
+        self.shown_y = np.full(capacity, np.iinfo(np.int64).min, dtype=np.int64)
+
+    def __len__(self):
+        return int(self.active.sum())
+
+    def spawn(self, xs, ys, vys, good):
+        """Activates free slots for the given dots (array-likes of equal length).
+
+        Dots that don't fit are dropped. Returns the slots used.
+        """
+        slots = np.flatnonzero(~self.active)[:len(xs)]
+        count = len(slots)
+        self.x[slots] = np.asarray(xs, dtype=float)[:count]
+        self.y[slots] = np.asarray(ys, dtype=float)[:count]
+        self.vy[slots] = np.asarray(vys, dtype=float)[:count]
+        self.good[slots] = np.asarray(good, dtype=bool)[:count]
+        self.active[slots] = True
+        return slots
+
+    def step(self, plate, bottom):
+        """Moves every active dot and tests it against the plate box and the bottom edge.
+
+        ``plate`` is (left, top, right, bottom), edges included. Caught and fallen
+        dots are deactivated. Returns (caught good, caught bad, missed good, slots freed).
+        """
+        active = self.active
+        self.y += np.where(active, self.vy, 0.0)
+        x = self.x
+        y = self.y
+        left, top, right, plate_bottom = plate
+        caught = active & (x >= left) & (x <= right) & (y >= top) & (y <= plate_bottom)
+        fallen = active & ~caught & (y >= bottom)
+        good = self.good
+        freed = caught | fallen
+        self.active = active & ~freed
+        return (int((caught & good).sum()), int((caught & ~good).sum()),
+                int((fallen & good).sum()), np.flatnonzero(freed))
+
+    def moved(self, area):
+        """Active slots inside ``area`` (left, top, right, bottom) whose integer position changed.
+
+        Returns (slots, xs, ys) and records those positions as shown.
+        """
+        left, top, right, bottom = area
+        xs = self.x.astype(np.int64)
+        ys = self.y.astype(np.int64)
+        visible = self.active & (xs >= left) & (xs <= right) & (ys >= top) & (ys <= bottom)
+        slots = np.flatnonzero(visible & ((xs != self.shown_x) | (ys != self.shown_y)))
+        xs = xs[slots]
+        ys = ys[slots]
+        self.shown_x[slots] = xs
+        self.shown_y[slots] = ys
+        return slots, xs, ys
+
+    def hide(self, slots, x, y):
+        """Records ``slots`` (all of them when None) as shown at the parking position (x, y)."""
+        if slots is None:
+            slots = slice(None)
+        self.shown_x[slots] = x
+        self.shown_y[slots] = y
@@ -1,14 +1,60 @@
-import nuke, math, random
-from PySide2.QtCore import QTimer, Qt, QObject
-from PySide2.QtGui import QKeyEvent
-from PySide2.QtWidgets import QApplication
+import nuke, math, time
+
+import raycaster
+from basegame import BaseGame
+from framebuffer import FrameBuffer
+from gameloop import FPS
+from inputs import KEY_DOWN, KEY_LEFT, KEY_RIGHT, KEY_SPACE, KEY_UP
+from renderers import ImageRenderer, NodeRenderer
+from spatial import FlowField, SpatialHash, sector_box
 
 # Helper: Convert an (R,G,B) tuple into an integer for Nuke’s tile_color (ARGB with alpha=255)
 def color_to_nuke(r, g, b):
     return (255 << 24) | (r << 16) | (g << 8) | b
 
-class Game:
-    def __init__(self):
+# Dark, high-contrast colors for the background.
+SKY_COLOR = color_to_nuke(0, 0, 10)       # Ceiling (sky): very dark blue.
+WALL_COLOR = color_to_nuke(40, 40, 40)    # Wall: dark gray.
+FLOOR_COLOR = color_to_nuke(10, 5, 0)     # Floor (ground): very dark brown.
+# Sprite colors.
+CANOPY_COLOR = color_to_nuke(0, 200, 0)   # Bright green canopy.
+TRUNK_COLOR = color_to_nuke(120, 50, 0)   # Vivid brown trunk.
+SKIN_COLOR = color_to_nuke(255, 220, 177)
+TORSO_COLOR = color_to_nuke(180, 0, 0)
+LEGS_COLOR = color_to_nuke(50, 0, 0)
+OUTLINE_COLOR = color_to_nuke(0, 0, 0)
+
+# Sprite kind -> (on-screen width / height, minimum width in columns).
+SPRITE_SHAPES = {
+    'tree': (0.2, 2),
+    'monster': (0.25, 3),
+}
+
+# Bucket size of the monster spatial hash, in map cells.
+MONSTER_CELL_SIZE = 2.0
+
+# Game seconds the crosshair stays red after a shot.
+SHOT_FLASH = 0.1
+
+# Keys the game takes while it runs.
+GAME_KEYS = (KEY_UP, KEY_DOWN, KEY_LEFT, KEY_RIGHT, KEY_SPACE)
+
+# Number of rows r in [0, height) with r < fraction * height.
+def rows_below(fraction, height):
+    return int(math.ceil(fraction * height))
+
+class Game(BaseGame):
+    KIND = "doom"
+
+    def __init__(self, use_numpy=None, renderer=None, adaptive=False, target_frame_ms=40.0,
+                 min_size=(40, 30), monster_count=3, fps=FPS, rng=None, profiler=None, display="grid"):
+        # The picture is either on a grid of Dot nodes (display="grid") or one image (display="image").
+        if display not in ("grid", "image"):
+            raise ValueError("display must be 'grid' or 'image', got %r" % (display,))
+        if renderer is None:
+            renderer = ImageRenderer() if display == "image" else NodeRenderer()
+        # An earlier game is closed, its pixel grid kept for this one.
+        self.open_session(renderer, rng, profiler)
         # Grid parameters (80x60 dots, reduced spacing)
         self.WIDTH = 80
         self.HEIGHT = 60
@@ -17,29 +63,14 @@ class Game:
         total_width = self.WIDTH * self.PIXEL_SIZE
         total_height = self.HEIGHT * self.PIXEL_SIZE
         margin = 50  # backdrop margin
+        # The grid always spans this area; a lower resolution spreads fewer cells over it.
+        self.VIEW_WIDTH = total_width
         
         # Create a backdrop node that encloses the dots area (with extra margin)
-        self.backdrop = nuke.createNode("BackdropNode", inpanel=False)
-        backdrop_x = -margin // 2
-        backdrop_y = -margin // 2
-        self.backdrop.setXpos(backdrop_x)
-        self.backdrop.setYpos(backdrop_y)
-        self.backdrop["bdwidth"].setValue(total_width + margin)
-        self.backdrop["bdheight"].setValue(total_height + margin)
-        self.backdrop["label"].setValue("Monsters Defeated: 0")
-        self.backdrop.setName("Game_Backdrop")
-
-        # Build an 80x60 grid of Dot nodes.
-        self.grid_nodes = []
-        for row in range(self.HEIGHT):
-            grid_row = []
-            for col in range(self.WIDTH):
-                dot = nuke.createNode("Dot", inpanel=False)
-                dot.setXpos(col * self.PIXEL_SIZE)
-                dot.setYpos(row * self.PIXEL_SIZE)
-                dot["hide_input"].setValue(True)
-                grid_row.append(dot)
-            self.grid_nodes.append(grid_row)
+        self.backdrop = self.renderer.create("BackdropNode", -margin // 2, -margin // 2,
+                                             name="Game_Backdrop", label="Monsters Defeated: 0",
+                                             width=total_width + margin, height=total_height + margin)
+        self.profiler.attach(self.renderer, (total_width + margin, -margin // 2), "doom")
 
         # Map data: a fixed, small map (20x8) where walls ('1') bound open space ('.')
         self.map_data = [
@@ -55,6 +86,11 @@ class Game:
         self.map_width = len(self.map_data[0])
         self.map_height = len(self.map_data)
 
+        # Cast and shade with the batched NumPy engine when it is available.
+        self.use_numpy = raycaster.HAS_NUMPY if use_numpy is None else use_numpy
+        if self.use_numpy:
+            self.wall_grid = raycaster.wall_grid(self.map_data)
+
         # Environmental objects (e.g., trees) with positions.
         self.environment_objects = [
             {'type': 'tree', 'x': 5.0, 'y': 2.0},
@@ -68,73 +104,97 @@ class Game:
         self.player_angle = 0.0  # 0 radians means facing right.
         self.FOV = math.pi / 4
 
+        # Set up the 80x60 grid of pixels, framebuffer and ray cache.
+        self.set_resolution(self.WIDTH, self.HEIGHT)
+
+        # Optionally trade resolution for frame time, between min_size and 80x60.
+        self.scaler = ResolutionScaler(min_size, (self.WIDTH, self.HEIGHT), target_frame_ms) if adaptive else None
+        self.frame_ms = 0.0  # update + render time of the last rendered tick
+
         # Count of monsters defeated.
         self.monsters_defeated = 0
 
         # Default pointer color is white.
         self.pointer_color = (255, 255, 255)
+        self.flash = None  # pending event that turns the pointer white again
+
+        # Monsters follow a flow field toward the player's cell and live in a spatial hash so
+        # shooting and view culling only look at the ones nearby.
+        self.flow_field = FlowField(self.map_data)
+        self.monster_hash = SpatialHash(MONSTER_CELL_SIZE)
 
         # Start with a few monsters.
+        self.monster_count = monster_count
         self.monsters = []
-        self.spawn_monster(initial=True)
-        self.spawn_monster(initial=True)
-        self.spawn_monster(initial=True)
-
-        # Set up the game loop timer (~20 frames per second).
-        self.timer = QTimer()
-        self.timer.timeout.connect(self.game_loop)
-        self.timer.start(50)
-
-    # Simple raycaster: cast a ray until a wall is hit.
-    def cast_ray(self, ray_angle):
-        ray_x = self.player_x
-        ray_y = self.player_y
-        step = 0.05
-        while True:
-            ray_x += math.cos(ray_angle) * step
-            ray_y += math.sin(ray_angle) * step
-            map_x = int(ray_x)
-            map_y = int(ray_y)
-            if (map_y < 0 or map_y >= self.map_height or
-                map_x < 0 or map_x >= self.map_width or
-                self.map_data[map_y][map_x] == "1"):
-                dx = ray_x - self.player_x
-                dy = ray_y - self.player_y
-                return math.sqrt(dx*dx + dy*dy)
-
-    # Update monster positions (they move toward the player).
+        for _ in range(self.monster_count):
+            self.spawn_monster(initial=True)
+
+        # Monsters move in fixed 50 ms steps however busy Nuke is; frames are drawn at up to fps
+        # with monster sprites interpolated between steps. The keys are read once per step:
+        # movement for as long as they are held, a shot per press.
+        # Effects run on game time, on the loop's scheduler; stopping the loop cancels them.
+        self.start_session(GAME_KEYS, self.update_monsters, self.render, fps, callback=self.game_loop)
+
+    # Switch the logical grid to width x height pixels spread over the same view area.
+    def set_resolution(self, width, height):
+        self.WIDTH = width
+        self.HEIGHT = height
+        self.PIXEL_SIZE = self.VIEW_WIDTH / float(width)
+        # With the default renderer these are Dot nodes, reused from an earlier game (or found
+        # in the script) when possible. Cells left over by a lower resolution are parked.
+        self.renderer.setup_grid(self.WIDTH, self.HEIGHT, self.PIXEL_SIZE, name="Doom4Nuke_px")
+
+        # Every pass draws into the framebuffer; only changed cells reach the Dot nodes.
+        self.framebuffer = FrameBuffer(self.WIDTH, self.HEIGHT)
+
+        # Wall distances are reused across frames while the player stands still, and the
+        # shaded wall layer is reused outright while neither position nor angle changed.
+        self.ray_cache = raycaster.RayCache(self.FOV, self.WIDTH)
+        self.wall_key = None
+        self.wall_layer = None
+        self.wall_distances = None
+
+    # Update monster positions. They follow the flow field toward the player's cell, and head
+    # straight for the player once they share a cell.
     def update_monsters(self):
+        self.flow_field.update(self.player_x, self.player_y)
+        move_speed = 0.02
         for monster in self.monsters:
-            if not monster['alive']:
-                continue
             dx = self.player_x - monster['x']
             dy = self.player_y - monster['y']
             distance = math.sqrt(dx*dx + dy*dy)
             if distance < 0.5:
                 # Stop game loop, notify death and ask if the player wants to restart.
-                self.timer.stop()
+                self.stop_play()
                 nuke.message("Game Over! You were killed by a monster.\nMonsters Defeated: " + str(self.monsters_defeated))
                 if nuke.ask("Do you want to restart the game?"):
-                    self.restart_game()
+                    self.restart_game()  # Keeps every node, the grid included.
+                else:
+                    self.close()
                 return
-            move_speed = 0.02
-            monster['x'] += (dx / distance) * move_speed
-            monster['y'] += (dy / distance) * move_speed
+            direction = self.flow_field.direction(monster['x'], monster['y'])
+            if direction is None:
+                direction = (dx / distance, dy / distance)
+            monster['previous'] = (monster['x'], monster['y'])
+            monster['x'] += direction[0] * move_speed
+            monster['y'] += direction[1] * move_speed
+            self.monster_hash.move(monster, monster['x'], monster['y'])
 
         # Spawn new monsters if there are too few alive.
-        alive_monsters = [m for m in self.monsters if m['alive']]
-        if len(alive_monsters) < 3:
+        if len(self.monsters) < self.monster_count:
             self.spawn_monster()
 
     # Randomly spawn a monster in an open area (and not too near the player).
     def spawn_monster(self, initial=False):
         attempts = 0
         while attempts < 100:
-            x = random.uniform(1, self.map_width - 2)
-            y = random.uniform(1, self.map_height - 2)
+            x = self.rng.uniform(1, self.map_width - 2)
+            y = self.rng.uniform(1, self.map_height - 2)
             if self.map_data[int(y)][int(x)] == '.':
                 if math.sqrt((x - self.player_x)**2 + (y - self.player_y)**2) > 2:
-                    self.monsters.append({'x': x, 'y': y, 'alive': True})
+                    monster = {'x': x, 'y': y, 'previous': (x, y), 'alive': True}
+                    self.monsters.append(monster)
+                    self.monster_hash.insert(monster, x, y)
                     break
             attempts += 1
 
@@ -144,111 +204,124 @@ class Game:
         self.player_y = 3.0
         self.player_angle = 0.0
         self.monsters_defeated = 0
+        self.pointer_color = (255, 255, 255)
         self.monsters = []
-        self.spawn_monster(initial=True)
-        self.spawn_monster(initial=True)
-        self.spawn_monster(initial=True)
-        self.timer.start(50)
+        self.monster_hash.clear()
+        for _ in range(self.monster_count):
+            self.spawn_monster(initial=True)
+        self.inputs.acquire(self, GAME_KEYS)
+        self.loop.start()
+
+    # Project a world position onto the screen. Returns (distance, screen_x) where screen_x
+    # is the column of the sprite's center; it may lie outside the screen.
+    def project(self, x, y):
+        dx = x - self.player_x
+        dy = y - self.player_y
+        distance = math.sqrt(dx*dx + dy*dy)
+        angle_diff = math.atan2(dy, dx) - self.player_angle
+        angle_diff = (angle_diff + math.pi) % (2 * math.pi) - math.pi
+        return distance, int((angle_diff + self.FOV / 2) / self.FOV * self.WIDTH)
 
-    # Render environmental objects with higher contrast.
-    def render_environment_objects(self, wall_distances):
+    # Live monsters from the spatial hash that may be visible: inside the bounding box of the
+    # view cone, cut off at the farthest wall (anything beyond it is hidden anyway).
+    def monsters_in_view(self, view_distance):
+        # Widen the cone a little so sprites centered just outside it can still show their edge,
+        # and the box by a sprite's size.
+        left, top, right, bottom = sector_box(self.player_x, self.player_y, self.player_angle,
+                                              self.FOV / 2 + 0.2, view_distance)
+        return [monster for monster in self.monster_hash.query_rect(left - 1, top - 1, right + 1, bottom + 1)
+                if monster['alive']]
+
+    # Draw trees and monsters back-to-front into the framebuffer. Each sprite column is
+    # clipped against the per-column wall z-buffer, and sprite width scales with distance.
+    # Monsters are drawn alpha of the way from their previous to their current position.
+    def render_sprites(self, zbuffer, alpha=1.0):
+        sprites = []
         for obj in self.environment_objects:
-            dx = obj['x'] - self.player_x
-            dy = obj['y'] - self.player_y
-            distance = math.sqrt(dx*dx + dy*dy)
-            angle_to_obj = math.atan2(dy, dx)
-            angle_diff = angle_to_obj - self.player_angle
-            angle_diff = (angle_diff + math.pi) % (2 * math.pi) - math.pi
-            if abs(angle_diff) < self.FOV / 2:
-                screen_x = int((angle_diff + self.FOV / 2) / self.FOV * self.WIDTH)
-                if screen_x < 0 or screen_x >= self.WIDTH:
-                    continue
-                if distance < wall_distances[screen_x]:
-                    obj_height = int(self.HEIGHT / (distance + 0.0001))
-                    obj_height = min(obj_height, self.HEIGHT)
-                    top = (self.HEIGHT - obj_height) // 2
-                    bottom = top + obj_height
-                    # Render a tree as a two–column sprite with bright contrast.
-                    tree_width = 2
-                    for col in range(max(0, screen_x - tree_width // 2),
-                                     min(self.WIDTH, screen_x - tree_width // 2 + tree_width)):
-                        for row in range(top, bottom):
-                            if row < top + (obj_height // 2):
-                                # Bright green canopy.
-                                self.grid_nodes[row][col]["tile_color"].setValue(color_to_nuke(0, 200, 0))
-                            else:
-                                # Vivid brown trunk.
-                                self.grid_nodes[row][col]["tile_color"].setValue(color_to_nuke(120, 50, 0))
-
-    # Render monsters with a human–like sprite (3 columns wide).
-    def render_monsters(self, wall_distances):
-        for monster in self.monsters:
-            if not monster['alive']:
+            sprites.append(self.project(obj['x'], obj['y']) + (obj['type'],))
+        for monster in self.monsters_in_view(max(zbuffer)):
+            previous_x, previous_y = monster['previous']
+            sprites.append(self.project(previous_x + (monster['x'] - previous_x) * alpha,
+                                        previous_y + (monster['y'] - previous_y) * alpha) + ('monster',))
+        sprites.sort(key=lambda sprite: sprite[0], reverse=True)
+
+        for distance, screen_x, kind in sprites:
+            if distance <= 0:
                 continue
-            dx = monster['x'] - self.player_x
-            dy = monster['y'] - self.player_y
-            distance = math.sqrt(dx*dx + dy*dy)
-            angle_to_monster = math.atan2(dy, dx)
-            angle_diff = angle_to_monster - self.player_angle
-            angle_diff = (angle_diff + math.pi) % (2 * math.pi) - math.pi
-            if abs(angle_diff) < self.FOV / 2:
-                screen_x = int((angle_diff + self.FOV / 2) / self.FOV * self.WIDTH)
-                if screen_x < 0 or screen_x >= self.WIDTH:
-                    continue
-                if distance < wall_distances[screen_x]:
-                    monster_height = int(self.HEIGHT / (distance + 0.0001))
-                    monster_height = min(monster_height, self.HEIGHT)
-                    top = (self.HEIGHT - monster_height) // 2
-                    bottom = top + monster_height
-                    sprite_width = 3  # three columns for a more human-like shape
-                    for col in range(max(0, screen_x - sprite_width // 2),
-                                     min(self.WIDTH, screen_x - sprite_width // 2 + sprite_width)):
-                        for row in range(top, bottom):
-                            rel = (row - top) / float(monster_height)
-                            if rel < 0.2:
-                                # Head: center is flesh-colored, sides black for outline.
-                                if col == screen_x:
-                                    color = (255, 220, 177)
-                                else:
-                                    color = (0, 0, 0)
-                            elif rel < 0.7:
-                                # Torso: red with alternating black details.
-                                if (col - (screen_x - sprite_width // 2)) % 2 == 0:
-                                    color = (180, 0, 0)
-                                else:
-                                    color = (0, 0, 0)
-                            else:
-                                # Legs: dark with slight variation.
-                                if (col - (screen_x - sprite_width // 2)) % 2 == 0:
-                                    color = (50, 0, 0)
-                                else:
-                                    color = (0, 0, 0)
-                            self.grid_nodes[row][col]["tile_color"].setValue(color_to_nuke(*color))
-
-    # Render the whole frame.
-    def render(self):
-        wall_distances = [0] * self.WIDTH
-        for col in range(self.WIDTH):
-            ray_angle = self.player_angle - self.FOV / 2 + (col / float(self.WIDTH)) * self.FOV
-            distance = self.cast_ray(ray_angle)
-            wall_distances[col] = distance
-            wall_height = int(self.HEIGHT / (distance + 0.0001))
-            wall_height = min(wall_height, self.HEIGHT)
-            wall_start = (self.HEIGHT - wall_height) // 2
-            wall_end = wall_start + wall_height
-            for row in range(self.HEIGHT):
-                # Dark, high-contrast colors for the background:
-                if row < wall_start:
-                    # Ceiling (sky): very dark blue.
-                    self.grid_nodes[row][col]["tile_color"].setValue(color_to_nuke(0, 0, 10))
-                elif wall_start <= row < wall_end:
-                    # Wall: dark gray.
-                    self.grid_nodes[row][col]["tile_color"].setValue(color_to_nuke(40, 40, 40))
+            sprite_height = min(int(self.HEIGHT / (distance + 0.0001)), self.HEIGHT)
+            aspect, min_width = SPRITE_SHAPES[kind]
+            sprite_width = max(min_width, int(sprite_height * aspect))
+            left = screen_x - sprite_width // 2
+            first_col = max(0, left)
+            last_col = min(self.WIDTH, left + sprite_width)
+            if first_col >= last_col or sprite_height <= 0:
+                continue  # Entirely off screen.
+            top = (self.HEIGHT - sprite_height) // 2
+            bottom = top + sprite_height
+            for col in range(first_col, last_col):
+                if distance >= zbuffer[col]:
+                    continue  # Hidden behind the wall in this column.
+                # Which third of the sprite this column is in (0 = left, 1 = middle, 2 = right).
+                third = (col - left) * 3 // sprite_width
+                if kind == 'tree':
+                    self.draw_tree_column(col, third, top, bottom, sprite_height)
                 else:
-                    # Floor (ground): very dark brown.
-                    self.grid_nodes[row][col]["tile_color"].setValue(color_to_nuke(10, 5, 0))
-        self.render_environment_objects(wall_distances)
-        self.render_monsters(wall_distances)
+                    self.draw_monster_column(col, third, top, bottom, sprite_height)
+
+    # A tree: bright green canopy over the upper half, vivid brown trunk in the middle below.
+    def draw_tree_column(self, col, third, top, bottom, sprite_height):
+        canopy_end = top + sprite_height // 2
+        self.framebuffer.fill_column(col, top, canopy_end, CANOPY_COLOR)
+        if third == 1 or sprite_height < 3:
+            self.framebuffer.fill_column(col, canopy_end, bottom, TRUNK_COLOR)
+
+    # A human-like monster: head, torso and legs, with black outline columns.
+    def draw_monster_column(self, col, third, top, bottom, sprite_height):
+        head_end = top + rows_below(0.2, sprite_height)
+        torso_end = top + rows_below(0.7, sprite_height)
+        # Head: center is flesh-colored, sides black for outline.
+        self.framebuffer.fill_column(col, top, head_end, SKIN_COLOR if third == 1 else OUTLINE_COLOR)
+        # Torso: red with alternating black details.
+        self.framebuffer.fill_column(col, head_end, torso_end, TORSO_COLOR if third % 2 == 0 else OUTLINE_COLOR)
+        # Legs: dark with slight variation.
+        self.framebuffer.fill_column(col, torso_end, bottom, LEGS_COLOR if third % 2 == 0 else OUTLINE_COLOR)
+
+    # Cast the given ray angles with the active engine and return their wall distances.
+    def cast_angles(self, angles):
+        if self.use_numpy:
+            return raycaster.cast_rays_numpy(self.wall_grid, self.player_x, self.player_y, angles)[0].tolist()
+        return raycaster.cast_rays(self.map_data, self.player_x, self.player_y, angles)
+
+    # Shade sky, wall and floor into the framebuffer, one ray per column.
+    # Returns the wall distance of every column.
+    def render_walls(self):
+        first = self.ray_cache.first_index(self.player_angle)
+        wall_key = (self.player_x, self.player_y, first)
+        if wall_key == self.wall_key:
+            # Nothing moved: the wall layer from the last cast is still exact.
+            self.framebuffer.load(self.wall_layer)
+            return self.wall_distances
+
+        distances = self.ray_cache.lookup(self.player_x, self.player_y, first, self.cast_angles)
+        if self.use_numpy:
+            wall_starts, wall_ends = raycaster.wall_spans_numpy(raycaster.np.array(distances), self.HEIGHT)
+            frame = raycaster.shade_columns_numpy(wall_starts, wall_ends, self.HEIGHT,
+                                                  SKY_COLOR, WALL_COLOR, FLOOR_COLOR)
+            self.framebuffer.load(frame.tolist())
+        else:
+            self.framebuffer.load(raycaster.shade_columns(distances, self.HEIGHT,
+                                                          SKY_COLOR, WALL_COLOR, FLOOR_COLOR))
+        self.wall_key = wall_key
+        self.wall_layer = list(self.framebuffer.pixels)
+        self.wall_distances = distances
+        return distances
+
+    # Render the whole frame into the framebuffer, then push the changed cells to the grid.
+    def render(self, alpha=1.0):
+        with self.profiler.phase('raycast'):
+            wall_distances = self.render_walls()
+        with self.profiler.phase('sprites'):
+            self.render_sprites(wall_distances, alpha)
         
         # Draw the player pointer (crosshair) at the center using the current pointer color.
         pointer_col = self.WIDTH // 2
@@ -260,17 +333,44 @@ class Game:
             (pointer_row, pointer_col - 1),
             (pointer_row, pointer_col + 1)
         ]
+        pointer_color = color_to_nuke(*self.pointer_color)
         for r, c in pointer_coords:
-            if 0 <= r < self.HEIGHT and 0 <= c < self.WIDTH:
-                self.grid_nodes[r][c]["tile_color"].setValue(color_to_nuke(*self.pointer_color))
-                
-        # Update the backdrop counter with the number of monsters defeated.
-        self.backdrop["label"].setValue("Monsters Defeated: " + str(self.monsters_defeated))
+            self.framebuffer.set_pixel(c, r, pointer_color)
+
+        with self.profiler.phase('commit'):
+            # Only the cells that differ from the previous frame cost a knob write.
+            self.renderer.present(self.framebuffer)
 
-    # Main game loop: update monsters then render the scene.
+            # Update the backdrop counter with the number of monsters defeated.
+            self.renderer.set_label(self.backdrop, "Monsters Defeated: " + str(self.monsters_defeated))
+            self.renderer.end_frame()
+
+    # Main game loop: run the monster steps that fell due, then render the scene once.
     def game_loop(self):
-        self.update_monsters()
-        self.render()
+        start = time.perf_counter()
+        if not self.loop.tick():
+            return
+        self.frame_ms = (time.perf_counter() - start) * 1000.0
+        if self.scaler is not None:
+            size = self.scaler.update(self.frame_ms)
+            if size is not None:
+                self.set_resolution(*size)
+
+    # Apply the keys held since the last step, and fire once for every press of Space.
+    def poll_input(self):
+        inputs = self.inputs
+        forward = inputs.axis(KEY_DOWN, KEY_UP)
+        if forward > 0:
+            self.move_forward()
+        elif forward < 0:
+            self.move_backward()
+        turn = inputs.axis(KEY_LEFT, KEY_RIGHT)
+        if turn < 0:
+            self.rotate_left()
+        elif turn > 0:
+            self.rotate_right()
+        if KEY_SPACE in inputs.take_pressed():
+            self.shoot()
 
     # Movement and control methods.
     def move_forward(self):
@@ -293,56 +393,78 @@ class Game:
     # Also, change the pointer color to red temporarily.
     def shoot(self):
         hit = False
-        for monster in self.monsters:
-            if not monster['alive']:
-                continue
+        # Only monsters in the bounding box of the narrow aiming cone can be hit.
+        shot_range = 5.0
+        box = sector_box(self.player_x, self.player_y, self.player_angle, 0.1, shot_range)
+        for monster in self.monster_hash.query_rect(*box):
             dx = monster['x'] - self.player_x
             dy = monster['y'] - self.player_y
             distance = math.sqrt(dx*dx + dy*dy)
             angle_to_monster = math.atan2(dy, dx)
             angle_diff = angle_to_monster - self.player_angle
             angle_diff = (angle_diff + math.pi) % (2 * math.pi) - math.pi
-            if abs(angle_diff) < 0.1 and distance < 5.0:
+            if abs(angle_diff) < 0.1 and distance < shot_range:
                 monster['alive'] = False
                 hit = True
                 self.monsters_defeated += 1
-        if not hit:
+                self.monster_hash.remove(monster)
+        if hit:
+            # Dead monsters are dropped right away so no pass ever walks over them again.
+            self.monsters = [monster for monster in self.monsters if monster['alive']]
+        else:
             self.monsters_defeated = max(0, self.monsters_defeated - 1)
         
-        # Change the pointer color to red for a short time to indicate shooting.
+        # Change the pointer color to red for a short time to indicate shooting; another shot
+        # before it turns white again restarts the flash.
         self.pointer_color = (255, 0, 0)
-        QTimer.singleShot(100, lambda: setattr(self, 'pointer_color', (255, 255, 255)))
-
-# A key listener that installs an event filter on the QApplication instance.
-class PlayerKeyListener(QObject):
-    def __init__(self, game):
-        super(PlayerKeyListener, self).__init__()
-        self.game = game
-        self.app = QApplication.instance()
-        if not self.app:
-            self.app = QApplication([])
-        self.app.installEventFilter(self)
-    
-    def eventFilter(self, obj, event):
-        if isinstance(event, QKeyEvent) and event.type() == QKeyEvent.KeyPress:
-            key = event.key()
-            if key == Qt.Key_Up:
-                self.game.move_forward()
-                return True
-            elif key == Qt.Key_Down:
-                self.game.move_backward()
-                return True
-            elif key == Qt.Key_Left:
-                self.game.rotate_left()
-                return True
-            elif key == Qt.Key_Right:
-                self.game.rotate_right()
-                return True
-            elif key == Qt.Key_Space:
-                self.game.shoot()
-                return True
-        return False
-
-# Instantiate the game and set up the key listener.
-game = Game()
-key_listener = PlayerKeyListener(game)
+        if self.flash is not None:
+            self.scheduler.cancel(self.flash)
+        self.flash = self.scheduler.after(SHOT_FLASH, setattr, self, 'pointer_color', (255, 255, 255))
+
+# Picks the logical grid size that holds a target frame time. Sizes step between min_size and
+# max_size keeping the aspect ratio; the frame time is smoothed, and after every change the
+# scaler waits a few frames so one slow frame doesn't make the resolution oscillate.
+class ResolutionScaler:
+    def __init__(self, min_size, max_size, target_ms, steps=5, smoothing=0.2, cooldown=10):
+        self.sizes = []
+        for i in range(steps + 1):
+            width = int(round(min_size[0] + (max_size[0] - min_size[0]) * i / float(steps)))
+            height = int(round(width * max_size[1] / float(max_size[0])))
+            self.sizes.append((width, height))
+        self.level = len(self.sizes) - 1  # start at full resolution
+        self.target_ms = target_ms
+        self.smoothing = smoothing
+        self.cooldown = cooldown
+        self.wait = cooldown
+        self.average_ms = None
+
+    # Feed the time of the last frame; returns a new (width, height) or None to keep the current one.
+    def update(self, frame_ms):
+        if self.average_ms is None:
+            self.average_ms = frame_ms
+        else:
+            self.average_ms += (frame_ms - self.average_ms) * self.smoothing
+        if self.wait > 0:
+            self.wait -= 1
+            return None
+        previous = self.sizes[self.level]
+        if self.average_ms > self.target_ms and self.level > 0:
+            self.level -= 1
+        elif self.average_ms < self.target_ms * 0.6 and self.level < len(self.sizes) - 1:
+            self.level += 1
+        else:
+            return None
+        self.wait = self.cooldown
+        # Frame time scales roughly with the cell count, so carry the estimate over to the new size.
+        size = self.sizes[self.level]
+        self.average_ms *= (size[0] * size[1]) / float(previous[0] * previous[1])
+        return size
+
+# Instantiate the game; it takes the keyboard while it runs.
+def start_doom_game(renderer=None, **options):
+    global game
+    game = Game(renderer=renderer, **options)
+
+# Running this file (e.g. from the Script Editor) starts a game; importing it doesn't.
+if __name__ == "__main__":
+    start_doom_game()
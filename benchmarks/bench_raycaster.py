@@ -0,0 +1,78 @@
+"""Compares the pure-Python and NumPy Doom4Nuke wall engines.
+
+Casts and shades full frames at several grid resolutions and prints the
+average time per frame of each engine. Runs without Nuke:
+
+    python benchmarks/bench_raycaster.py [--frames N]
+"""
+
+import argparse
+import math
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+import raycaster
+
+RESOLUTIONS = [(80, 60), (160, 120), (320, 240)]
+FOV = math.pi / 4
+SKY, WALL, FLOOR = 0xFF00000A, 0xFF282828, 0xFF0A0500
+
+
+def build_map(width=48, height=32):
+    """A walled arena with a lattice of pillars, so rays cross a realistic number of cells."""
+    rows = []
+    for y in range(height):
+        row = []
+        for x in range(width):
+            border = x in (0, width - 1) or y in (0, height - 1)
+            pillar = x % 6 == 3 and y % 5 == 2
+            row.append("1" if border or pillar else ".")
+        rows.append("".join(row))
+    return rows
+
+
+def bench_pure(map_data, width, height, frames):
+    start = time.perf_counter()
+    for frame in range(frames):
+        angle = frame * 0.1
+        angles = raycaster.column_angles(angle, FOV, width)
+        distances = raycaster.cast_rays(map_data, 4.5, 4.5, angles)
+        raycaster.shade_columns(distances, height, SKY, WALL, FLOOR)
+    return (time.perf_counter() - start) / frames
+
+
+def bench_numpy(map_data, width, height, frames):
+    walls = raycaster.wall_grid(map_data)
+    start = time.perf_counter()
+    for frame in range(frames):
+        angle = frame * 0.1
+        angles = raycaster.column_angles_numpy(angle, FOV, width)
+        distances = raycaster.cast_rays_numpy(walls, 4.5, 4.5, angles)[0]
+        wall_starts, wall_ends = raycaster.wall_spans_numpy(distances, height)
+        raycaster.shade_columns_numpy(wall_starts, wall_ends, height, SKY, WALL, FLOOR)
+    return (time.perf_counter() - start) / frames
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--frames", type=int, default=50, help="frames to render per engine and resolution")
+    args = parser.parse_args()
+
+    map_data = build_map()
+    print("%-10s %12s %12s %8s" % ("grid", "python ms", "numpy ms", "speedup"))
+    for width, height in RESOLUTIONS:
+        pure = bench_pure(map_data, width, height, args.frames)
+        if raycaster.HAS_NUMPY:
+            vector = bench_numpy(map_data, width, height, args.frames)
+            print("%-10s %12.2f %12.2f %7.1fx" % ("%dx%d" % (width, height), pure * 1000, vector * 1000, pure / vector))
+        else:
+            print("%-10s %12.2f %12s %8s" % ("%dx%d" % (width, height), pure * 1000, "n/a", "-"))
+    if not raycaster.HAS_NUMPY:
+        print("NumPy is not installed; only the pure-Python engine was measured.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Measures monster swarm ticks per second as the number of dots in flight grows.
+
+Compares a per-dot Python loop, as the classic monster game does it, with the
+NumPy ``DotSwarm``. A tick moves every dot, tests it against the plate and
+the bottom edge, respawns the dots that left play, and finds the ones whose
+node would need a write. Runs without Nuke:
+
+    python benchmarks/bench_swarm.py [--ticks N]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "Arcade"))
+
+import swarm
+
+COUNTS = [100, 1000, 5000, 20000]
+AREA = (50, 50, 457, 843)
+PLATE = (150, 750, 250, 770)
+FALL_SPEED = 5.0
+
+
+class Dot(object):
+    __slots__ = ('x', 'y', 'good', 'shown')
+
+
+def bench_python(count, ticks):
+    rng = random.Random(1)
+    left, top, right, bottom = AREA
+    dots = []
+    for _ in range(count):
+        dot = Dot()
+        dot.x = rng.uniform(left, right)
+        dot.y = rng.uniform(top, bottom)
+        dot.good = rng.random() < 0.8
+        dot.shown = None
+        dots.append(dot)
+    plate_left, plate_top, plate_right, plate_bottom = PLATE
+    start = time.perf_counter()
+    for _ in range(ticks):
+        for dot in dots:
+            dot.y += FALL_SPEED
+            caught = plate_left <= dot.x <= plate_right and plate_top <= dot.y <= plate_bottom
+            if caught or dot.y >= bottom:
+                dot.y = top  # back in play at the top
+            position = (int(dot.x), int(dot.y))
+            if position != dot.shown:
+                dot.shown = position
+    return ticks / (time.perf_counter() - start)
+
+
+def bench_numpy(count, ticks):
+    rng = random.Random(1)
+    left, top, right, bottom = AREA
+    dots = swarm.DotSwarm(count)
+    dots.spawn([rng.uniform(left, right) for _ in range(count)], [rng.uniform(top, bottom) for _ in range(count)],
+               [FALL_SPEED] * count, [rng.random() < 0.8 for _ in range(count)])
+    start = time.perf_counter()
+    for _ in range(ticks):
+        freed = dots.step(PLATE, bottom)[3]
+        if len(freed):
+            dots.spawn(dots.x[freed], [top] * len(freed), [FALL_SPEED] * len(freed), dots.good[freed])
+        dots.moved(AREA)
+    return ticks / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--ticks", type=int, default=100, help="ticks to run per engine and dot count")
+    args = parser.parse_args()
+
+    print("%-8s %14s %14s %8s" % ("dots", "python tick/s", "numpy tick/s", "speedup"))
+    for count in COUNTS:
+        pure = bench_python(count, args.ticks)
+        if swarm.HAS_NUMPY:
+            vector = bench_numpy(count, args.ticks)
+            print("%-8d %14.0f %14.0f %7.1fx" % (count, pure, vector, vector / pure))
+        else:
+            print("%-8d %14.0f %14s %8s" % (count, pure, "n/a", "-"))
+    if not swarm.HAS_NUMPY:
+        print("NumPy is not installed; only the Python loop was measured.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""Regression tests that run the games' building blocks without Nuke or Qt.
+
+``headless.install`` has to come before any game module is imported, so it
+runs at import time here. Run from the repository root:
+
+    python -m pytest tests
+"""
+
+import math
+import os
+import random
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [os.path.join(ROOT, "Arcade"), ROOT]
+
+import headless
+
+headless.install(0)
+
+import raycaster
+import replay
+from inputs import KEY_LEFT, KEY_RIGHT
+from NukeTower import PlatformRing
+from renderers import ArrayRenderer
+from scheduler import Scheduler
+from spatial import sweep_box
+
+
+def build_map(width=24, height=16):
+    """A walled arena with a lattice of pillars."""
+    rows = []
+    for y in range(height):
+        rows.append("".join(
+            "1" if x in (0, width - 1) or y in (0, height - 1) or (x % 6 == 3 and y % 5 == 2) else "."
+            for x in range(width)))
+    return rows
+
+
+def test_numpy_rays_match_dda():
+    pytest.importorskip("numpy")
+    map_data = build_map()
+    walls = raycaster.wall_grid(map_data)
+    rng = random.Random(1)
+    for _ in range(50):
+        x, y = rng.uniform(1.1, 22.9), rng.uniform(1.1, 14.9)
+        if raycaster.is_wall(map_data, int(x), int(y)):
+            continue
+        angles = raycaster.column_angles(rng.uniform(-math.pi, math.pi), math.pi / 4, 80)
+        expected = raycaster.cast_rays(map_data, x, y, angles)
+        distances = raycaster.cast_rays_numpy(walls, x, y, angles)[0]
+        assert distances.tolist() == pytest.approx(expected, abs=1e-9)
+
+
+def test_sweep_box_hits_first_side():
+    # Moving right into the left side of the box, 40% of the way along.
+    assert sweep_box(0, 5, 10, 0, 4, 0, 8, 10) == (pytest.approx(0.4), 0)
+    # Moving down onto the top side.
+    assert sweep_box(5, 0, 0, 10, 0, 2, 10, 4) == (pytest.approx(0.2), 1)
+    # A fast point can't tunnel through a thin box.
+    assert sweep_box(0, 5, 100, 0, 50, 0, 51, 10) == (pytest.approx(0.5), 0)
+
+
+def test_sweep_box_misses():
+    assert sweep_box(0, 20, 10, 0, 4, 0, 8, 10) is None  # passes below
+    assert sweep_box(0, 5, 3, 0, 4, 0, 8, 10) is None    # stops short
+    assert sweep_box(6, 5, 0, 0, 4, 0, 8, 10) is None    # not moving
+    assert sweep_box(9, 5, 5, 0, 4, 0, 8, 10) is None    # moving away
+
+
+def test_platform_ring_between_matches_linear_scan():
+    rng = random.Random(3)
+    for _ in range(500):
+        ring = PlatformRing(ArrayRenderer(), 7)
+        ring.first = rng.randrange(7)
+        y = 1000
+        for _ in range(rng.randrange(8)):
+            ring.push_top(0, y)
+            y -= rng.choice([0, 50, 150])
+        if len(ring) and rng.random() < 0.5:
+            ring.pop_bottom()
+        top, bottom = sorted(rng.uniform(0, 1100) for _ in range(2))
+        expected = [platform for platform in reversed(list(ring)) if top <= platform.y <= bottom]
+        assert ring.between(top, bottom) == expected
+
+
+def test_scheduler_order_and_cancel():
+    scheduler = Scheduler()
+    fired = []
+    scheduler.after(0.2, fired.append, "b")
+    scheduler.after(0.1, fired.append, "a")
+    scheduler.after(0.2, fired.append, "c")  # same time as "b": runs after it
+    cancelled = scheduler.after(0.15, fired.append, "x")
+    repeat = scheduler.every(0.1, fired.append, "r")
+    scheduler.cancel(cancelled)
+    scheduler.advance(0.1)
+    assert fired == ["a", "r"]
+    scheduler.advance(0.1)
+    assert fired == ["a", "r", "b", "c", "r"]
+    scheduler.cancel(repeat)
+    scheduler.advance(1.0)
+    assert fired == ["a", "r", "b", "c", "r"]
+    assert len(scheduler) == 0
+
+
+@pytest.mark.parametrize("name", ["blocks", "monster"])
+def test_replay_reproduces_live_game(name):
+    seed = 5
+    session = headless.install(seed)
+    game = replay.create_game(name, session.rng())
+    recorder = replay.Recorder(name, seed).attach(game)
+    for key, seconds in ((KEY_LEFT, 0.33), (KEY_RIGHT, 0.51), (KEY_LEFT, 0.01)):
+        session.press(key)
+        session.run(seconds)
+        session.release(key)
+        session.run(0.27)
+    while game.loop.running and session.clock.now < 120:
+        session.run(1.0)
+    assert not game.loop.running
+    live = replay.digest(session, game)
+    live_ops = dict(session.nuke.ops)
+
+    log = replay.Log.from_bytes(recorder.log.to_bytes())
+    assert len(log.records) == 6
+    assert log.records == recorder.log.records
+    session, game = replay.replay(log, max_seconds=120)
+    assert replay.digest(session, game) == live
+    assert dict(session.nuke.ops) == live_ops